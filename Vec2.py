@@ -6,6 +6,8 @@ EPSILON_SQ = EPSILON ** 2
 
 
 class Vec2:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x=0.0, y=0.0):
         self.x: float = x
         self.y: float = y
@@ -20,8 +22,9 @@ class Vec2:
 
     def length_sq_other(self, other: Self) -> float:
         """ Finds distance and squares to find the length """
-        v = Vec2(self.x - other.x, self.y - other.y)
-        return (v.x ** 2) + (v.y ** 2)
+        x = self.x - other.x
+        y = self.y - other.y
+        return (x ** 2) + (y ** 2)
 
     def normalise_self(self, x_only=False, y_only=False) -> Self:
         """ This vector with a length of 1 (in place) """
@@ -79,6 +82,43 @@ class Vec2:
         """ Cross this and float, returns a new vec """
         return Vec2(self.y * f, self.x * -f)
 
+    def cross_fl_into(self, f: float, out: Self) -> Self:
+        """ Cross this and float, writing the result into out (can be self). Returns out """
+        x = self.y * f
+        out.y = self.x * -f
+        out.x = x
+        return out
+
+    def add_self(self, other: Self) -> Self:
+        """ Add vector to self (in place) """
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def sub_self(self, other: Self) -> Self:
+        """ Subtract vector from self (in place) """
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def mul_self(self, f: float) -> Self:
+        """ Scale self by float (in place) """
+        self.x *= f
+        self.y *= f
+        return self
+
+    def add_scaled_self(self, other: Self, f: float) -> Self:
+        """ Add vector scaled by float to self, without creating the scaled vector (in place) """
+        self.x += other.x * f
+        self.y += other.y * f
+        return self
+
+    def sub_into(self, other: Self, out: Self) -> Self:
+        """ Subtract other from self, writing the result into out (can be self or other). Returns out """
+        out.x = self.x - other.x
+        out.y = self.y - other.y
+        return out
+
     def cross_vec(self, other: Self) -> float:
         """ Cross product of self and vector (returns a scalar) """
         if isinstance(other, Vec2):
@@ -0,0 +1,59 @@
+from typing import Self
+
+from Vec2 import Vec2
+
+
+class AABB:
+    """ Axis aligned bounding box, stored as its min (top left) and max (bottom right) corners in world space """
+    def __init__(self, min_v: Vec2 = None, max_v: Vec2 = None):
+        self.min: Vec2 = min_v if min_v is not None else Vec2()
+        self.max: Vec2 = max_v if max_v is not None else Vec2()
+
+    def overlaps(self, other: Self) -> bool:
+        """ Whether this box and other box intersect (touching counts) """
+        return (self.min.x <= other.max.x and other.min.x <= self.max.x and
+                self.min.y <= other.max.y and other.min.y <= self.max.y)
+
+    def contains_point(self, p: Vec2) -> bool:
+        """ Whether point is within this box (touching counts) """
+        return self.min.x <= p.x <= self.max.x and self.min.y <= p.y <= self.max.y
+
+    def ray_distance(self, origin: Vec2, direction: Vec2, max_dist: float) -> float | None:
+        """ Distance along the ray (normalised direction) where it enters this box, 0 if starting within. None if missed or further than max dist """
+        lower: float = 0.0
+        upper: float = max_dist
+        for o, d, lo, hi in ((origin.x, direction.x, self.min.x, self.max.x), (origin.y, direction.y, self.min.y, self.max.y)):
+            if d == 0:
+                if o < lo or o > hi:
+                    return None  # parallel & outside the slab
+                continue
+
+            inv_d = 1 / d
+            t1, t2 = (lo - o) * inv_d, (hi - o) * inv_d
+            if t1 > t2:
+                t1, t2 = t2, t1
+            lower, upper = max(lower, t1), min(upper, t2)
+            if lower > upper:
+                return None
+        return lower
+
+    def contains(self, other: Self) -> bool:
+        """ Whether other box is entirely within this box """
+        return (self.min.x <= other.min.x and self.min.y <= other.min.y and
+                other.max.x <= self.max.x and other.max.y <= self.max.y)
+
+    def union(self, other: Self) -> Self:
+        """ Returns a new box enclosing both this and other box """
+        return AABB(Vec2(min(self.min.x, other.min.x), min(self.min.y, other.min.y)),
+                    Vec2(max(self.max.x, other.max.x), max(self.max.y, other.max.y)))
+
+    def fatten(self, margin: float) -> Self:
+        """ Returns a new box grown by margin on every side """
+        return AABB(self.min - margin, self.max + margin)
+
+    def perimeter(self) -> float:
+        """ Perimeter of box, used as the cost of a box when building trees """
+        return 2 * ((self.max.x - self.min.x) + (self.max.y - self.min.y))
+
+    def __repr__(self):
+        return f'AABB(min: {self.min}, max: {self.max})'
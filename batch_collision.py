@@ -0,0 +1,268 @@
+from constants import *
+from Vec2 import Vec2, EPSILON_SQ
+from objects import Object, Circle, Polygon
+from manifold import Manifold, clip_incident_face
+
+np = lazy_import('numpy')  # numpy is optional, only needed when batching collisions
+
+MIN_BATCH_SIZE = 16  # smaller batches are cheaper to solve one at a time
+
+
+def solve_pair(a: Object, b: Object) -> Manifold | None:
+    """ Scalar narrow phase for one pair. Returns the manifold if colliding """
+    man = Manifold(a, b)
+    man.solve_collision()
+    return man if man.contact_count > 0 else None
+
+
+def batch_circle_circle(pairs: list[tuple[Circle, Circle]]) -> list[Manifold | None]:
+    """ Vectorized circle_colliding_circle over every pair. Returns manifolds (None if not colliding) in pair order """
+    n = len(pairs)
+    pos_a = np.array([(a.pos.x, a.pos.y) for a, _ in pairs], dtype=float).reshape(n, 2)
+    pos_b = np.array([(b.pos.x, b.pos.y) for _, b in pairs], dtype=float).reshape(n, 2)
+    radius_a = np.array([a.radius for a, _ in pairs], dtype=float)
+    radius = radius_a + np.array([b.radius for _, b in pairs], dtype=float)
+
+    normal = pos_b - pos_a
+    dist_sq = normal[:, 0] ** 2 + normal[:, 1] ** 2
+    colliding = dist_sq < radius * radius
+    dist = np.sqrt(dist_sq)
+    same_pos = dist == 0  # they are on same pos (chose random value)
+
+    safe_dist = np.where(same_pos, 1.0, dist)
+    normal /= safe_dist[:, None]  # normalise
+    normal[same_pos] = (1.0, 0.0)
+    penetration = np.where(same_pos, radius_a, radius - dist)
+    contact = normal * radius_a[:, None] + pos_a
+    contact[same_pos] = pos_a[same_pos]
+
+    manifolds: list[Manifold | None] = [None] * n
+    for i in np.flatnonzero(colliding).tolist():
+        man = Manifold(*pairs[i])
+        man.normal = Vec2(*normal[i].tolist())
+        man.penetration = float(penetration[i])
+        man.contact_points[0] = Vec2(*contact[i].tolist())
+        man.contact_count = 1
+        manifolds[i] = man
+    return manifolds
+
+
+class PolygonPack:
+    """ Model space vertices & normals of polygons, padded to Polygon.MAX_VERTEX_COUNT so many polygons can be processed together """
+    def __init__(self, polys: list[Polygon]):
+        width = Polygon.MAX_VERTEX_COUNT
+        n = len(polys)
+        self.index: dict[Polygon, int] = {p: i for i, p in enumerate(polys)}
+
+        self.vertices = np.zeros((n, width, 2))
+        self.normals = np.zeros((n, width, 2))
+        self.counts = np.array([p.vertex_count for p in polys], dtype=int)
+        for i, p in enumerate(polys):
+            self.vertices[i, :p.vertex_count] = [v.get() for v in p.vertices]
+            self.normals[i, :p.vertex_count] = [nm.get() for nm in p.normals[:p.vertex_count]]
+        self.valid = np.arange(width)[None, :] < self.counts[:, None]  # real (not padding) vertices
+
+        self.mat = np.array([(p.mat2.m00, p.mat2.m01, p.mat2.m10, p.mat2.m11) for p in polys], dtype=float).reshape(n, 4)
+        self.pos = np.array([(p.pos.x, p.pos.y) for p in polys], dtype=float).reshape(n, 2)
+
+    def world_normals(self, inx) -> tuple:
+        """ Normals of polys at inx rotated into world space, as (x, y) arrays """
+        m = self.mat[inx]
+        nx, ny = self.normals[inx, :, 0], self.normals[inx, :, 1]
+        return (m[:, 0, None] * nx) + (m[:, 1, None] * ny), (m[:, 2, None] * nx) + (m[:, 3, None] * ny)
+
+    def world_vertices(self, inx) -> tuple:
+        """ Vertices of polys at inx in world space, as (x, y) arrays """
+        m = self.mat[inx]
+        vx, vy = self.vertices[inx, :, 0], self.vertices[inx, :, 1]
+        return (((m[:, 0, None] * vx) + (m[:, 1, None] * vy)) + self.pos[inx, 0, None],
+                ((m[:, 2, None] * vx) + (m[:, 3, None] * vy)) + self.pos[inx, 1, None])
+
+
+def transpose_mul(m, x, y) -> tuple:
+    """ Rotate (x, y) arrays by the transpose of matrices m (rows of m00, m01, m10, m11) """
+    return (m[:, 0, None] * x) + (m[:, 2, None] * y), (m[:, 1, None] * x) + (m[:, 3, None] * y)
+
+
+def batch_axis_penetration(pack: PolygonPack, a, b) -> tuple:
+    """ Vectorized find_axis_penetration of polys a against polys b (index arrays into pack). Returns (face indexes, penetrations) """
+    normal_x, normal_y = pack.world_normals(a)
+    vert_x, vert_y = pack.world_vertices(a)
+    b_mat = pack.mat[b]
+
+    # face normals in b's model space
+    bn_x, bn_y = transpose_mul(b_mat, normal_x, normal_y)
+
+    # support point of b along each negated normal, shape (pairs, faces of a, vertices of b)
+    b_vx, b_vy = pack.vertices[b, :, 0], pack.vertices[b, :, 1]
+    proj = (b_vx[:, None, :] * -bn_x[:, :, None]) + (b_vy[:, None, :] * -bn_y[:, :, None])
+    proj = np.where(pack.valid[b][:, None, :], proj, -np.inf)
+    support = np.argmax(proj, axis=2)
+    support_x = np.take_along_axis(b_vx, support, axis=1)
+    support_y = np.take_along_axis(b_vy, support, axis=1)
+
+    # face vertices in b's model space
+    vx, vy = transpose_mul(b_mat, vert_x - pack.pos[b, 0, None], vert_y - pack.pos[b, 1, None])
+
+    penetration = (bn_x * (support_x - vx)) + (bn_y * (support_y - vy))
+    penetration = np.where(pack.valid[a], penetration, -np.inf)
+    best = np.argmax(penetration, axis=1)
+    return best, penetration[np.arange(len(best)), best]
+
+
+def batch_incident_face(pack: PolygonPack, ref, inc, ref_inx):
+    """ Vectorized find_incident_face. Returns incident face indexes """
+    normal_x, normal_y = pack.world_normals(ref)
+    rows = np.arange(len(ref))
+    ref_x, ref_y = transpose_mul(pack.mat[inc], normal_x[rows, ref_inx][:, None], normal_y[rows, ref_inx][:, None])
+
+    dots = (ref_x * pack.normals[inc, :, 0]) + (ref_y * pack.normals[inc, :, 1])
+    dots = np.where(pack.valid[inc], dots, np.inf)
+    return np.argmin(dots, axis=1)
+
+
+def batch_poly_poly(pairs: list[tuple[Polygon, Polygon]]) -> list[Manifold | None]:
+    """ Vectorized poly_colliding_poly SAT over every pair, only colliding pairs are clipped for contact points. Returns manifolds in pair order """
+    n = len(pairs)
+    pack = PolygonPack(list(dict.fromkeys(p for pair in pairs for p in pair)))
+    a = np.array([pack.index[p1] for p1, _ in pairs], dtype=int)
+    b = np.array([pack.index[p2] for _, p2 in pairs], dtype=int)
+
+    face_a, pen_a = batch_axis_penetration(pack, a, b)
+    face_b, pen_b = batch_axis_penetration(pack, b, a)
+    colliding = (pen_a < 0.0) & (pen_b < 0.0)
+
+    # reference face is on the poly with the greatest penetration (with bias), always a to b
+    flip = ~(pen_a >= (pen_b * Forces.BIAS_RELATIVE) + (pen_a * Forces.BIAS_ABSOLUTE))
+    ref = np.where(flip, b, a)
+    inc = np.where(flip, a, b)
+    ref_inx = np.where(flip, face_b, face_a)
+    inc_inx = batch_incident_face(pack, ref, inc, ref_inx)
+
+    manifolds: list[Manifold | None] = [None] * n
+    for i in np.flatnonzero(colliding).tolist():
+        p1, p2 = pairs[i]
+        is_flip = bool(flip[i])
+        ref_poly, inc_poly = (p2, p1) if is_flip else (p1, p2)
+
+        man = Manifold(p1, p2)
+        if clip_incident_face(man, ref_poly, inc_poly, int(ref_inx[i]), int(inc_inx[i]), is_flip):
+            manifolds[i] = man if man.contact_count > 0 else None
+    return manifolds
+
+
+def batch_circle_poly(pairs: list[tuple[Object, Object]]) -> list[Manifold | None]:
+    """ Vectorized circle_colliding_poly (& poly_colliding_circle) over every pair. Returns manifolds (None if not colliding) in pair order """
+    n = len(pairs)
+    circles: list[Circle] = [a if isinstance(a, Circle) else b for a, b in pairs]
+    polys: list[Polygon] = [b if isinstance(a, Circle) else a for a, b in pairs]
+    poly_first = np.array([not isinstance(a, Circle) for a, _ in pairs], dtype=bool)
+
+    pack = PolygonPack(list(dict.fromkeys(polys)))
+    p = np.array([pack.index[poly] for poly in polys], dtype=int)
+    c_pos = np.array([(c.pos.x, c.pos.y) for c in circles], dtype=float).reshape(n, 2)
+    radius = np.array([c.radius for c in circles], dtype=float)
+    mat = pack.mat[p]
+    rows = np.arange(n)
+
+    # circle center into polygon model space
+    center_x, center_y = transpose_mul(mat, (c_pos[:, 0] - pack.pos[p, 0])[:, None], (c_pos[:, 1] - pack.pos[p, 1])[:, None])
+    center_x, center_y = center_x[:, 0], center_y[:, 0]
+
+    # best separation within radius
+    verts, normals, counts = pack.vertices[p], pack.normals[p], pack.counts[p]
+    sep = (normals[:, :, 0] * (center_x[:, None] - verts[:, :, 0])) + (normals[:, :, 1] * (center_y[:, None] - verts[:, :, 1]))
+    sep = np.where(pack.valid[p], sep, -np.inf)
+    too_far = np.any(sep > radius[:, None], axis=1)
+    v_inx = np.argmax(sep, axis=1)
+    separation = sep[rows, v_inx]
+
+    # face vertices & normal
+    v2_inx = (v_inx + 1) % counts
+    v1_x, v1_y = verts[rows, v_inx, 0], verts[rows, v_inx, 1]
+    v2_x, v2_y = verts[rows, v2_inx, 0], verts[rows, v2_inx, 1]
+    n_x, n_y = normals[rows, v_inx, 0], normals[rows, v_inx, 1]
+    world_n_x = -((mat[:, 0] * n_x) + (mat[:, 1] * n_y))
+    world_n_y = -((mat[:, 2] * n_x) + (mat[:, 3] * n_y))
+
+    inside = separation < EPSILON
+
+    # voronoi region of the edge the center lies within
+    dot1 = ((center_x - v1_x) * (v2_x - v1_x)) + ((center_y - v1_y) * (v2_y - v1_y))
+    dot2 = ((center_x - v2_x) * (v1_x - v2_x)) + ((center_y - v2_y) * (v1_y - v2_y))
+    on_v1 = dot1 <= 0
+    on_vertex = on_v1 | (dot2 <= 0)
+    v_x = np.where(on_v1, v1_x, v2_x)
+    v_y = np.where(on_v1, v1_y, v2_y)
+
+    vertex_too_far = ((center_x - v_x) ** 2) + ((center_y - v_y) ** 2) > radius ** 2
+    face_too_far = ((center_x - v1_x) * n_x) + ((center_y - v1_y) * n_y) > radius
+    colliding = ~too_far & (inside | np.where(on_vertex, ~vertex_too_far, ~face_too_far))
+
+    # vertex normal (from center to vertex, in world space) & vertex contact
+    d_x, d_y = v_x - center_x, v_y - center_y
+    vn_x = (mat[:, 0] * d_x) + (mat[:, 1] * d_y)
+    vn_y = (mat[:, 2] * d_x) + (mat[:, 3] * d_y)
+    vn_len_sq = (vn_x ** 2) + (vn_y ** 2)
+    inv_len = np.where(vn_len_sq > EPSILON_SQ, 1 / np.sqrt(np.where(vn_len_sq > 0, vn_len_sq, 1.0)), 1.0)
+    vn_x = np.where(vn_len_sq > EPSILON_SQ, vn_x * inv_len, vn_x)
+    vn_y = np.where(vn_len_sq > EPSILON_SQ, vn_y * inv_len, vn_y)
+    vc_x = ((mat[:, 0] * v_x) + (mat[:, 1] * v_y)) + pack.pos[p, 0]
+    vc_y = ((mat[:, 2] * v_x) + (mat[:, 3] * v_y)) + pack.pos[p, 1]
+
+    use_vertex = ~inside & on_vertex
+    normal_x = np.where(use_vertex, vn_x, world_n_x)
+    normal_y = np.where(use_vertex, vn_y, world_n_y)
+    contact_x = np.where(use_vertex, vc_x, np.where(inside, (normal_x * radius) + c_pos[:, 0], c_pos[:, 0] + (normal_x * radius)))
+    contact_y = np.where(use_vertex, vc_y, np.where(inside, (normal_y * radius) + c_pos[:, 1], c_pos[:, 1] + (normal_y * radius)))
+    penetration = np.where(inside, radius, radius - separation)
+
+    feature_vertex = np.where(on_v1, v_inx, v2_inx)
+
+    # poly_colliding_circle reverses the normal
+    normal_x = np.where(poly_first, -normal_x, normal_x)
+    normal_y = np.where(poly_first, -normal_y, normal_y)
+
+    manifolds: list[Manifold | None] = [None] * n
+    for i in np.flatnonzero(colliding).tolist():
+        man = Manifold(*pairs[i])
+        man.normal = Vec2(float(normal_x[i]), float(normal_y[i]))
+        man.penetration = float(penetration[i])
+        man.contact_points[0] = Vec2(float(contact_x[i]), float(contact_y[i]))
+        man.feature = ('vertex', int(feature_vertex[i])) if use_vertex[i] else ('face', int(v_inx[i]))
+        man.contact_count = 1
+        manifolds[i] = man
+    return manifolds
+
+
+def solve_pairs(pairs: list[tuple[Object, Object]], min_batch=MIN_BATCH_SIZE) -> list[Manifold]:
+    """
+    Narrow phase for every pair, pairs of the same shape types are solved together in one numpy pass (if there are enough of them).
+    Returns the colliding manifolds, in pair order.
+    """
+    if np is None:
+        raise ImportError('Batched collisions require numpy')
+
+    results: list[Manifold | None] = [None] * len(pairs)
+    kernels = {
+        (True, True): batch_circle_circle,
+        (True, False): batch_circle_poly,
+        (False, True): batch_circle_poly,
+        (False, False): batch_poly_poly,
+    }
+    batches: dict[tuple[bool, bool], list[int]] = {key: [] for key in kernels}
+
+    for i, (a, b) in enumerate(pairs):
+        batches[(isinstance(a, Circle), isinstance(b, Circle))].append(i)
+
+    batches[(True, False)] += batches.pop((False, True))  # one kernel handles both orders
+    for key, inxs in batches.items():
+        if len(inxs) >= min_batch:
+            batched = kernels[key]([pairs[i] for i in inxs])
+            for i, man in zip(inxs, batched):
+                results[i] = man
+        else:
+            for i in inxs:
+                results[i] = solve_pair(*pairs[i])
+
+    return [man for man in results if man is not None]
@@ -0,0 +1,170 @@
+from constants import *
+from Vec2 import Vec2, EPSILON_SQ
+from aabb import AABB
+from objects import Object, Circle, Polygon, DEF_MASK
+from queries import WorldQuery
+from batch_collision import PolygonPack
+
+np = lazy_import('numpy')  # numpy is optional, only needed when batch raycasting
+
+
+def make_fan(count: int, angle: float, spread: float):
+    """ Normalised directions of count rays spread evenly (radians) around angle, as an (n, 2) array """
+    if np is None:
+        raise ImportError('Batch raycasting requires numpy')
+
+    angles = angle + np.linspace(-spread / 2, spread / 2, count)
+    return np.stack((np.cos(angles), np.sin(angles)), axis=1)
+
+
+def slab(o, d, lo, hi) -> tuple:
+    """ Distances along rays (o, d) where they enter & leave the slabs (lo, hi) of one axis, every ray against every slab """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_d = 1 / d
+        t1, t2 = (lo - o) * inv_d, (hi - o) * inv_d
+
+    parallel = d == 0
+    inside = (lo <= o) & (o <= hi)
+    near = np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    far = np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    return near, far
+
+
+def batch_ray_circle(origins, directions, max_dist, pos, radius) -> tuple:
+    """ Vectorized Circle.raycast over every (ray, circle). Returns (distances (inf if missed), normals) """
+    s = origins - pos
+    b = (s * directions).sum(axis=1)
+    c = (s * s).sum(axis=1) - radius * radius
+    disc = b * b - c
+    dist = -b - np.sqrt(np.maximum(disc, 0.0))
+
+    hit = (c >= 0) & (disc >= 0) & (dist >= 0) & (dist <= max_dist)  # c < 0, starts within
+    normals = (s + directions * dist[:, None]) / radius[:, None]
+    return np.where(hit, dist, np.inf), normals
+
+
+def batch_ray_poly(origins, directions, max_dist, pack: PolygonPack, inx) -> tuple:
+    """ Vectorized Polygon.raycast over every (ray, poly at inx), clipping against the half-plane of every face. Returns (distances (inf if missed), normals) """
+    vx, vy = pack.world_vertices(inx)
+    nx, ny = pack.world_normals(inx)
+    valid = pack.valid[inx]
+    o_x, o_y = origins[:, 0, None], origins[:, 1, None]
+
+    numerator = nx * (vx - o_x) + ny * (vy - o_y)
+    denominator = nx * directions[:, 0, None] + ny * directions[:, 1, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = numerator / denominator
+
+    entering = np.where(valid & (denominator < 0), t, -np.inf)
+    leaving = np.where(valid & (denominator > 0), t, np.inf)
+    parallel_out = (valid & (denominator == 0) & (numerator < 0)).any(axis=1)  # parallel & in front of face
+
+    face = entering.argmax(axis=1)
+    lower = entering.max(axis=1)
+    upper = np.minimum(leaving.min(axis=1), max_dist)
+    hit = (lower > 0) & (lower <= upper) & ~parallel_out  # lower <= 0, starts within
+
+    rows = np.arange(len(inx))
+    normals = np.stack((nx[rows, face], ny[rows, face]), axis=1)
+    return np.where(hit, lower, np.inf), normals
+
+
+def batch_raycast(query: WorldQuery, origins, directions, max_dist, mask=DEF_MASK, include_static=True) -> tuple:
+    """
+    Many WorldQuery.raycast at once, e.g. sensor fans. origins & directions are (n, 2) arrays, max dist a float or (n) array.
+    Rays are binned by origin & candidates found with one query of each bin's bounds, then every ray is tested against only the candidate boxes (of its bin) it passes through.
+    Returns (distances (inf if missed), normals (n, 2), ids (index into query.objects, -1 if missed))
+    """
+    if np is None:
+        raise ImportError('Batch raycasting requires numpy')
+
+    origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+    directions = np.array(directions, dtype=float).reshape(-1, 2)
+    n = len(origins)
+    max_dist = np.broadcast_to(np.asarray(max_dist, dtype=float), (n,))
+
+    length_sq = (directions ** 2).sum(axis=1)
+    valid = length_sq > EPSILON_SQ
+    directions /= np.sqrt(np.where(valid, length_sq, 1.0))[:, None]
+
+    distances = np.full(n, np.inf)
+    normals = np.zeros((n, 2))
+    ids = np.full(n, -1, dtype=int)
+    if not valid.any():
+        return distances, normals, ids
+
+    # rays are binned by origin (e.g. one fan per agent), each bin only tests the candidates within its own rays' bounds
+    ends = origins + directions * max_dist[:, None]
+    low, high = np.minimum(origins, ends), np.maximum(origins, ends)
+    cast = np.flatnonzero(valid)
+    _, bin_of, bin_sizes = np.unique(origins[cast], axis=0, return_inverse=True, return_counts=True)
+    bins = np.split(cast[np.argsort(bin_of.reshape(-1), kind='stable')], np.cumsum(bin_sizes)[:-1])
+
+    candidates: list[Object] = []
+    candidate_index: dict[Object, int] = {}
+    bin_candidates: list[list[int]] = []
+    for r in bins:
+        bounds = AABB(Vec2(*low[r].min(axis=0).tolist()), Vec2(*high[r].max(axis=0).tolist()))
+        found: list[int] = []
+        for obj in query.query_aabb(bounds, mask, include_static):
+            if isinstance(obj, (Circle, Polygon)):
+                if obj not in candidate_index:
+                    candidate_index[obj] = len(candidates)
+                    candidates.append(obj)
+                found.append(candidate_index[obj])
+        bin_candidates.append(found)
+    if not candidates:
+        return distances, normals, ids
+
+    # every ray against its bin's candidate boxes, only the pairs passing through are tested against the shapes
+    box_min = np.array([obj.get_aabb().min.get() for obj in candidates], dtype=float)
+    box_max = np.array([obj.get_aabb().max.get() for obj in candidates], dtype=float)
+    ray_parts, cand_parts = [], []
+    for r, k in zip(bins, bin_candidates):
+        if not k:
+            continue
+        k = np.array(k, dtype=int)
+        near_x, far_x = slab(origins[r, 0, None], directions[r, 0, None], box_min[None, k, 0], box_max[None, k, 0])
+        near_y, far_y = slab(origins[r, 1, None], directions[r, 1, None], box_min[None, k, 1], box_max[None, k, 1])
+        lower = np.maximum(np.maximum(near_x, near_y), 0.0)
+        upper = np.minimum(np.minimum(far_x, far_y), max_dist[r, None])
+        i, j = np.nonzero(lower <= upper)
+        ray_parts.append(r[i])
+        cand_parts.append(k[j])
+    ray = np.concatenate(ray_parts) if ray_parts else np.zeros(0, dtype=int)
+    cand = np.concatenate(cand_parts) if cand_parts else np.zeros(0, dtype=int)
+
+    pair_dist = np.full(len(ray), np.inf)
+    pair_normals = np.zeros((len(ray), 2))
+
+    is_circle = np.array([isinstance(obj, Circle) for obj in candidates], dtype=bool)
+    c = np.flatnonzero(is_circle[cand])
+    if len(c):
+        pos = np.array([obj.pos.get() if isinstance(obj, Circle) else (0.0, 0.0) for obj in candidates], dtype=float)
+        radius = np.array([obj.radius if isinstance(obj, Circle) else 1.0 for obj in candidates], dtype=float)
+        r, k = ray[c], cand[c]
+        pair_dist[c], pair_normals[c] = batch_ray_circle(origins[r], directions[r], max_dist[r], pos[k], radius[k])
+
+    p = np.flatnonzero(~is_circle[cand])
+    if len(p):
+        polys = [obj for obj in candidates if not isinstance(obj, Circle)]
+        pack = PolygonPack(polys)
+        pack_inx = np.array([pack.index[obj] if not isinstance(obj, Circle) else -1 for obj in candidates], dtype=int)
+        r, k = ray[p], cand[p]
+        pair_dist[p], pair_normals[p] = batch_ray_poly(origins[r], directions[r], max_dist[r], pack, pack_inx[k])
+
+    # nearest hit per ray, ties keep the first object (same as WorldQuery.raycast)
+    hit = np.flatnonzero(np.isfinite(pair_dist))
+    if not len(hit):
+        return distances, normals, ids
+
+    object_ids = np.array([query.order[obj] for obj in candidates], dtype=int)
+    ray, cand, pair_dist, pair_normals = ray[hit], cand[hit], pair_dist[hit], pair_normals[hit]
+    order = np.lexsort((object_ids[cand], pair_dist, ray))
+    rays, first = np.unique(ray[order], return_index=True)
+    best = order[first]
+
+    distances[rays] = pair_dist[best]
+    normals[rays] = pair_normals[best]
+    ids[rays] = object_ids[cand[best]]
+    return distances, normals, ids
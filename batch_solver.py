@@ -0,0 +1,230 @@
+from constants import *
+from Vec2 import EPSILON_SQ
+from objects import Object
+from manifold import Manifold
+
+np = lazy_import('numpy')  # numpy is optional, only needed when using the batch solver
+
+
+def colour_collisions(collisions: list[Manifold]) -> list[list[int]]:
+    """
+    Greedy graph colouring of the contact graph. Returns batches of collision indexes where no two collisions share a non-static object,
+    so every collision in a batch can be resolved at the same time. Static objects are never changed by impulses so they may be shared
+    """
+    batches: list[list[int]] = []
+    object_colours: dict[Object, set[int]] = {}
+
+    for i, man in enumerate(collisions):
+        dynamic = [obj for obj in (man.a, man.b) if not obj.static]
+        used: set[int] = set()
+        for obj in dynamic:
+            used |= object_colours.get(obj, set())
+
+        colour = 0
+        while colour in used:
+            colour += 1
+        if colour == len(batches):
+            batches.append([])
+
+        batches[colour].append(i)
+        for obj in dynamic:
+            object_colours.setdefault(obj, set()).add(colour)
+    return batches
+
+
+class ContactArrays:
+    """ Velocities of the objects & the values of every contact needed by the solver, as arrays. See Manifold.resolve_collision for the maths """
+    def __init__(self, collisions: list[Manifold], resting=Values.RESTING):
+        self.collisions = collisions
+        self.resting: float = resting  # squared vertical speed below which contacts don't bounce
+        self.objects: list[Object] = list({obj: None for man in collisions for obj in (man.a, man.b)})
+        index: dict[Object, int] = {obj: i for i, obj in enumerate(self.objects)}
+        n = len(collisions)
+
+        # objects
+        self.vel_x = np.array([obj.velocity.x for obj in self.objects], dtype=float)
+        self.vel_y = np.array([obj.velocity.y for obj in self.objects], dtype=float)
+        self.ang_vel = np.array([obj.angular_velocity for obj in self.objects], dtype=float)
+        self.inv_mass = np.array([obj.inv_mass for obj in self.objects], dtype=float)
+        self.inv_inertia = np.array([obj.inv_inertia for obj in self.objects], dtype=float)
+
+        # collisions
+        self.a = np.array([index[man.a] for man in collisions], dtype=int)
+        self.b = np.array([index[man.b] for man in collisions], dtype=int)
+        self.normal_x = np.array([man.normal.x for man in collisions], dtype=float)
+        self.normal_y = np.array([man.normal.y for man in collisions], dtype=float)
+        self.count = np.array([man.contact_count for man in collisions], dtype=int)
+        self.restitution = np.array([min(man.a.material.restitution, man.b.material.restitution) for man in collisions], dtype=float)
+        self.static_friction = np.array([math.sqrt(man.a.static_friction ** 2 + man.b.static_friction ** 2) for man in collisions], dtype=float)
+        self.dynamic_friction = np.array([math.sqrt(man.a.dynamic_friction ** 2 + man.b.dynamic_friction ** 2) for man in collisions], dtype=float)
+
+        # per contact (2 per collision)
+        self.rel_a = np.array([[(cp.x - man.a.pos.x, cp.y - man.a.pos.y) for cp in man.contact_points] for man in collisions], dtype=float).reshape(n, 2, 2)
+        self.rel_b = np.array([[(cp.x - man.b.pos.x, cp.y - man.b.pos.y) for cp in man.contact_points] for man in collisions], dtype=float).reshape(n, 2, 2)
+        self.normal_impulses = np.array([man.normal_impulses for man in collisions], dtype=float).reshape(n, 2)
+        self.tangent_impulses = np.array([man.tangent_impulses for man in collisions], dtype=float).reshape(n, 2)
+        self.warm_impulses = np.array([man.warm_impulses for man in collisions], dtype=float).reshape(n, 2)
+
+    def relative_velocity(self, a, b, ra_x, ra_y, rb_x, rb_y) -> tuple:
+        """ Manifold.get_relative_velocity for every contact, as (x, y) arrays """
+        rel_x = (self.vel_x[b] - rb_y * self.ang_vel[b]) - (self.vel_x[a] - ra_y * self.ang_vel[a])
+        rel_y = (self.vel_y[b] - rb_x * -self.ang_vel[b]) - (self.vel_y[a] - ra_x * -self.ang_vel[a])
+        return rel_x, rel_y
+
+    def apply_impulse(self, objs, r_x, r_y, imp_x, imp_y, sign: float):
+        """ Object.apply_impulse for every contact (objects must be unique, or static) """
+        self.vel_x[objs] += imp_x * (sign * self.inv_mass[objs])
+        self.vel_y[objs] += imp_y * (sign * self.inv_mass[objs])
+        self.ang_vel[objs] += self.inv_inertia[objs] * (sign * (r_x * imp_y - r_y * imp_x))
+
+    def accumulate_impulse(self, inx, k: int, imp_x, imp_y):
+        """ Manifold.accumulate_impulse for every contact """
+        n_x, n_y = self.normal_x[inx], self.normal_y[inx]
+        self.normal_impulses[inx, k] += imp_x * n_x + imp_y * n_y
+        self.tangent_impulses[inx, k] += imp_x * n_y - imp_y * n_x
+
+    def resolve_batch(self, inx) -> 'np.ndarray':
+        """ Manifold.resolve_collision for every collision in the batch at once. Returns the largest change in relative velocity per collision """
+        max_change = np.zeros(len(inx))
+        live = np.ones(len(inx), dtype=bool)  # cleared once a contact is separating (the rest of that collision is skipped)
+
+        for k in range(2):
+            sel = np.flatnonzero(live & (self.count[inx] > k))
+            if not len(sel):
+                break
+            m = inx[sel]
+            a, b = self.a[m], self.b[m]
+            ra_x, ra_y = self.rel_a[m, k, 0], self.rel_a[m, k, 1]
+            rb_x, rb_y = self.rel_b[m, k, 0], self.rel_b[m, k, 1]
+            n_x, n_y = self.normal_x[m], self.normal_y[m]
+
+            # relative values
+            rel_x, rel_y = self.relative_velocity(a, b, ra_x, ra_y, rb_x, rb_y)
+            contact_vel = rel_x * n_x + rel_y * n_y
+            ra_cross_n = ra_x * n_y - ra_y * n_x
+            rb_cross_n = rb_x * n_y - rb_y * n_x
+            inv_masses = self.inv_mass[a] + self.inv_mass[b] + ((ra_cross_n ** 2) * self.inv_inertia[a]) + ((rb_cross_n ** 2) * self.inv_inertia[b])
+
+            # separating, take back excess warm start impulse or skip the rest of the collision
+            separating = contact_vel > 0
+            excess = separating & (self.warm_impulses[m, k] > 0)
+            live[sel[separating & ~excess]] = False
+
+            if excess.any():
+                e = np.flatnonzero(excess)
+                me = m[e]
+                j = np.minimum(contact_vel[e] / inv_masses[e], self.warm_impulses[me, k])
+                imp_x, imp_y = n_x[e] * j, n_y[e] * j
+                self.apply_impulse(a[e], ra_x[e], ra_y[e], imp_x, imp_y, 1.0)
+                self.apply_impulse(b[e], rb_x[e], rb_y[e], imp_x, imp_y, -1.0)
+                self.normal_impulses[me, k] -= j
+                self.warm_impulses[me, k] -= j
+                max_change[sel[e]] = np.maximum(max_change[sel[e]], j * inv_masses[e])
+
+            c = np.flatnonzero(~separating)
+            if not len(c):
+                continue
+            m, a, b = m[c], a[c], b[c]
+            ra_x, ra_y, rb_x, rb_y = ra_x[c], ra_y[c], rb_x[c], rb_y[c]
+            n_x, n_y = n_x[c], n_y[c]
+            contact_vel, inv_masses, rel_y = contact_vel[c], inv_masses[c], rel_y[c]
+            count = self.count[m]
+
+            # restitution & rebound
+            is_resting = rel_y ** 2 <= self.resting
+            restitution = self.restitution[m]
+            rebound_x = -(restitution + 1)
+            rebound_y = -(np.where(is_resting, 0.0, restitution) + 1)  # fix jitter-ing objects
+
+            # impulse (scalar per axis)
+            impulse_x = rebound_x * contact_vel / inv_masses / count
+            impulse_y = rebound_y * contact_vel / inv_masses / count
+
+            imp_x, imp_y = n_x * impulse_x, n_y * impulse_y
+            self.apply_impulse(a, ra_x, ra_y, imp_x, imp_y, -1.0)
+            self.apply_impulse(b, rb_x, rb_y, imp_x, imp_y, 1.0)
+            self.accumulate_impulse(m, k, imp_x, imp_y)
+            change = np.abs(rebound_y * contact_vel) / count
+
+            # FRICTION IMPULSE
+            rel_x, rel_y = self.relative_velocity(a, b, ra_x, ra_y, rb_x, rb_y)  # re-calculate after applying main impulse
+            rel_vel_n = -(rel_x * n_x + rel_y * n_y)
+            tan_x, tan_y = rel_x + n_x * rel_vel_n, rel_y + n_y * rel_vel_n  # tangent
+            length_sq = (tan_x ** 2) + (tan_y ** 2)
+            inv_len = 1 / np.sqrt(np.where(length_sq > EPSILON_SQ, length_sq, 1.0))  # Vec2.normalise_self leaves tiny vectors alone
+            tan_x, tan_y = tan_x * inv_len, tan_y * inv_len
+
+            impulse_tan_scalar = -(rel_x * tan_x + rel_y * tan_y)
+            impulse_tan_scalar /= inv_masses
+            impulse_tan_scalar /= count
+
+            f = np.flatnonzero(impulse_tan_scalar != 0)
+            if len(f):
+                jt, tan_x, tan_y = impulse_tan_scalar[f], tan_x[f], tan_y[f]
+                impulse_x, impulse_y = impulse_x[f], impulse_y[f]
+
+                # Coulumb's law (at rest, or already moving where less friction is required)
+                at_rest = np.abs(jt) < impulse_x * self.static_friction[m[f]]
+                df = self.dynamic_friction[m[f]]
+                imp_x = np.where(at_rest, tan_x * jt, (tan_x * impulse_x) * -df)
+                imp_y = np.where(at_rest, tan_y * jt, (tan_y * impulse_y) * -df)
+
+                self.apply_impulse(a[f], ra_x[f], ra_y[f], imp_x, imp_y, -1.0)
+                self.apply_impulse(b[f], rb_x[f], rb_y[f], imp_x, imp_y, 1.0)
+                self.accumulate_impulse(m[f], k, imp_x, imp_y)
+                change[f] = np.maximum(change[f], np.sqrt((imp_x ** 2) + (imp_y ** 2)) * inv_masses[f])
+
+            max_change[sel[c]] = np.maximum(max_change[sel[c]], change)
+        return max_change
+
+    def write_back(self):
+        """ Copy the solved velocities & impulses back to the objects & manifolds """
+        for obj, vx, vy, av in zip(self.objects, self.vel_x.tolist(), self.vel_y.tolist(), self.ang_vel.tolist()):
+            if not obj.static:
+                obj.velocity.set(vx, vy)
+                obj.angular_velocity = av
+
+        for man, normal, tangent, warm in zip(self.collisions, self.normal_impulses.tolist(), self.tangent_impulses.tolist(), self.warm_impulses.tolist()):
+            man.normal_impulses = normal
+            man.tangent_impulses = tangent
+            man.warm_impulses = warm
+
+
+def solve_islands(island_collisions: list[list[Manifold]], budgets: list[int], tolerance: float, resting=Values.RESTING) -> list[int]:
+    """
+    Same as islands.solve_island for every island, but each pass resolves the collisions (of every island still solving) in coloured batches.
+    Returns iterations used per island
+    """
+    if np is None:
+        raise ImportError('The batch solver requires numpy')
+
+    collisions: list[Manifold] = []
+    island_of: list[int] = []
+    for i, colls in enumerate(island_collisions):
+        for man in colls:
+            if man.contact_count:
+                collisions.append(man)
+                island_of.append(i)
+
+    arrays = ContactArrays(collisions, resting)
+    island = np.array(island_of, dtype=int)
+    batches = [np.array(batch, dtype=int) for batch in colour_collisions(collisions)]
+
+    budgets = np.array(budgets, dtype=int)
+    used = budgets.copy()
+    solving = budgets > 0
+    for it in range(int(budgets.max(initial=0))):
+        island_change = np.zeros(len(budgets))
+        for batch in batches:
+            batch = batch[solving[island[batch]]]
+            if len(batch):
+                np.maximum.at(island_change, island[batch], arrays.resolve_batch(batch))
+
+        converged = solving & (island_change < tolerance)
+        used[converged] = it + 1
+        solving &= ~converged & (budgets > it + 1)
+        if not solving.any():
+            break
+
+    arrays.write_back()
+    return used.tolist()
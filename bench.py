@@ -0,0 +1,106 @@
+"""
+Physics benchmarks, reports steps/sec & allocations per step of a randomly filled scene.
+Also reports the cold start import time of the physics (in a fresh interpreter), which should not load pygame or numpy.
+usage: python bench.py [bodies] [steps] [--batch] [--batch-solve] [--gjk]
+"""
+import os
+import random
+import subprocess
+import sys
+import time
+
+from constants import *
+from Vec2 import Vec2
+from mat2 import Mat2
+from objects import Circle, Polygon
+import manifold
+import gjk
+from world import World
+from game import default_objects, default_water
+
+
+def build_world(bodies: int, seed=0, **world_kwargs) -> World:
+    """ Headless world with the game's default objects & water, plus the given number of random circles & polygons """
+    world = World(**world_kwargs)
+    world.water = default_water(world.clock)
+    world.set_objects(default_objects())
+
+    rand = random.Random(seed)
+    for i in range(bodies):
+        pos = Vec2(70 + rand.random() * 160, 10 + rand.random() * 60)
+        if i % 4:
+            obj = Circle(pos, rand.randint(3, 6))
+        else:
+            obj = Polygon(pos, [Vec2(0, 0), Vec2(8, 0), Vec2(9, 6), Vec2(0, 8)])
+            obj.orientation = rand.random() * math.tau
+            obj.set_orient()
+        world.objects_group.add(obj)
+    return world
+
+
+def count_allocations(step, steps: int) -> dict[str, float]:
+    """ Average number of Vec2 & Mat2 created per call of step """
+    counts = {Vec2: 0, Mat2: 0}
+    originals = {cls: cls.__init__ for cls in counts}
+
+    def counting(cls):
+        def init(self, *args, **kwargs):
+            counts[cls] += 1
+            originals[cls](self, *args, **kwargs)
+        return init
+
+    for cls in counts:
+        cls.__init__ = counting(cls)
+    try:
+        for _ in range(steps):
+            step()
+    finally:
+        for cls, init in originals.items():
+            cls.__init__ = init
+    return {cls.__name__: n / steps for cls, n in counts.items()}
+
+
+def steps_per_sec(step, steps: int) -> float:
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    return steps / (time.perf_counter() - start)
+
+
+def cold_import(module: str) -> tuple[float, list[str]]:
+    """ Seconds to import module in a fresh interpreter & which of the heavy optional dependencies it loaded """
+    code = ('import sys, time\n'
+            'start = time.perf_counter()\n'
+            f'import {module}\n'
+            'print(time.perf_counter() - start)\n'
+            'print(" ".join(name for name in ("pygame", "numpy") if name in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__))).stdout.splitlines()
+    return float(out[0]), out[1].split() if len(out) > 1 else []
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    bodies = int(args[0]) if len(args) > 0 else 100
+    steps = int(args[1]) if len(args) > 1 else 300
+
+    if '--gjk' in sys.argv:  # every polygon pair, static boxes included
+        manifold.set_narrow_phase(Polygon, Polygon, gjk.poly_colliding_poly)
+        manifold.set_narrow_phase(Circle, Polygon, gjk.circle_colliding_poly)
+        manifold.set_narrow_phase(Polygon, Circle, gjk.poly_colliding_circle)
+
+    world = build_world(bodies, batch_narrow_phase='--batch' in sys.argv, batch_solve='--batch-solve' in sys.argv)
+    print(f'bodies: {len(world.objects_group.objects)}, steps: {steps}')
+    print('steps/sec: {:.1f}'.format(steps_per_sec(world.step, steps)))
+    used = world.iterations_used
+    print(f'solver iterations (last step): islands: {len(used)}, total: {sum(used)}, most: {max(used, default=0)}')
+
+    allocs = count_allocations(world.step, max(1, steps // 10))
+    print('allocations/step: ' + ', '.join(f'{name}: {n:.0f}' for name, n in allocs.items()))
+
+    seconds, loaded = cold_import('world')
+    print('cold import (world): {:.1f}ms, loaded: {}'.format(seconds * 1000, ', '.join(loaded) or 'nothing heavy'))
+
+
+if __name__ == '__main__':
+    main()
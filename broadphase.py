@@ -0,0 +1,431 @@
+import math
+
+from aabb import AABB
+from Vec2 import Vec2
+from objects import Object, should_filters_ignore
+
+DEF_CELL_SIZE = 20
+DEF_AABB_MARGIN = 3
+
+
+class Broadphase:
+    """ Finds the pairs of objects that could be colliding, so the narrow phase only has to check those """
+    def find_pairs(self, objects: list[Object]) -> list[tuple[Object, Object]]:
+        """ Returns candidate pairs (a, b), where a comes before b in objects """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+class FilterBuckets:
+    """
+    Works out which collision filters (see Object.get_filter) can collide once per pair of filters, instead of once per pair of objects.
+    Broadphases bucket objects by filter & only look in the buckets that can collide, so filtered out pairs are never made
+    """
+    def __init__(self):
+        self.can_collide: dict[tuple, bool] = {}  # (filter a, filter b): result, kept across steps
+
+    def get_partners(self, filters: list[tuple]) -> dict[tuple, list[tuple]]:
+        """ For every distinct filter given, the filters it can collide with (in order first seen) """
+        keys = list(dict.fromkeys(filters))
+        partners = {}
+        for key_a in keys:
+            partners[key_a] = []
+            for key_b in keys:
+                found = self.can_collide.get((key_a, key_b))
+                if found is None:
+                    found = self.can_collide[(key_a, key_b)] = not should_filters_ignore(key_a, key_b)
+                if found:
+                    partners[key_a].append(key_b)
+        return partners
+
+
+class BruteForce(Broadphase):
+    """ Checks every object against every later object (that its filter can collide with), O(n^2) """
+    def __init__(self):
+        self.filters: FilterBuckets = FilterBuckets()
+
+    def find_pairs(self, objects: list[Object]) -> list[tuple[Object, Object]]:
+        filters = [obj.get_filter() for obj in objects]
+        partners = self.filters.get_partners(filters)
+        buckets: dict[tuple, list[int]] = {}
+        pairs = []
+
+        for ib, b in enumerate(objects):
+            for key in partners[filters[ib]]:
+                for ia in buckets.get(key, ()):  # only earlier objects, prevents duplicate checks (and self checks)
+                    pairs.append((ia, ib))
+            buckets.setdefault(filters[ib], []).append(ib)
+
+        pairs.sort()
+        return [(objects[ia], objects[ib]) for ia, ib in pairs]
+
+
+class SpatialHash(Broadphase):
+    """
+    Uniform grid, rebuilt every step. Objects are bucketed into every cell their bounds touch, only objects sharing a cell are paired.
+    Each cell is split into filter buckets, so only buckets that can collide are looked at
+    """
+    def __init__(self, cell_size=DEF_CELL_SIZE):
+        self.cell_size: float = cell_size
+        self.cells: dict[tuple[int, int], dict[tuple, list[int]]] = {}  # cell: filter: object indexes
+        self.filters: FilterBuckets = FilterBuckets()
+
+    def get_cell_range(self, box: AABB) -> tuple[int, int, int, int]:
+        """ Returns the (min x, min y, max x, max y) cell coords covered by the given bounds """
+        inv_size = 1 / self.cell_size
+        return (math.floor(box.min.x * inv_size), math.floor(box.min.y * inv_size),
+                math.floor(box.max.x * inv_size), math.floor(box.max.y * inv_size))
+
+    def find_pairs(self, objects: list[Object]) -> list[tuple[Object, Object]]:
+        self.cells.clear()
+        boxes = [obj.get_aabb() for obj in objects]
+        filters = [obj.get_filter() for obj in objects]
+        partners = self.filters.get_partners(filters)
+        pairs = []
+
+        for ib, b in enumerate(objects):
+            checked: set[int] = set()  # objects already tested against b (can share more than 1 cell)
+            min_x, min_y, max_x, max_y = self.get_cell_range(boxes[ib])
+            key = filters[ib]
+            partner_keys = partners[key]
+
+            for cx in range(min_x, max_x + 1):
+                for cy in range(min_y, max_y + 1):
+                    cell = self.cells.setdefault((cx, cy), {})
+
+                    found: list[int] = []
+                    for partner_key in partner_keys:
+                        for ia in cell.get(partner_key, ()):
+                            if ia in checked:
+                                continue
+                            checked.add(ia)
+
+                            if boxes[ia].overlaps(boxes[ib]):
+                                found.append(ia)
+                    found.sort()  # keep the order objects were added in, the solver is order dependant
+                    pairs.extend((objects[ia], b) for ia in found)
+                    cell.setdefault(key, []).append(ib)
+
+        return pairs
+
+    def __repr__(self):
+        return f'SpatialHash(cell size: {self.cell_size}, cells: {len(self.cells)})'
+
+
+class TreeNode:
+    """ Node of an AABBTree. Leaves hold an object, branches always have 2 children """
+    def __init__(self, box: AABB, obj: Object | None = None):
+        self.box: AABB = box
+        self.obj: Object | None = obj
+        self.parent: TreeNode | None = None
+        self.left: TreeNode | None = None
+        self.right: TreeNode | None = None
+
+    def is_leaf(self) -> bool:
+        return self.left is None
+
+    def __repr__(self):
+        return f'TreeNode(leaf: {self.is_leaf()}, box: {self.box})'
+
+
+class AABBTree:
+    """ Bounding volume hierarchy which is updated incrementally by inserting & removing leaves """
+    def __init__(self):
+        self.root: TreeNode | None = None
+
+    def insert(self, obj: Object, box: AABB) -> TreeNode:
+        """ Insert new leaf for object. Returns the leaf """
+        leaf = TreeNode(box, obj)
+        self.insert_leaf(leaf)
+        return leaf
+
+    def insert_leaf(self, leaf: TreeNode):
+        """ Find the cheapest sibling for the leaf (by perimeter) & pair them under a new branch """
+        if self.root is None:
+            self.root = leaf
+            return
+
+        box = leaf.box
+        node = self.root
+        while not node.is_leaf():
+            perimeter = node.box.perimeter()
+            combined = node.box.union(box).perimeter()
+
+            cost = 2 * combined  # cost of making a new parent for this node & the leaf
+            inherited = 2 * (combined - perimeter)  # minimum cost of pushing the leaf further down
+
+            def descend_cost(child: TreeNode) -> float:
+                cost_child = child.box.union(box).perimeter() + inherited
+                if not child.is_leaf():
+                    cost_child -= child.box.perimeter()
+                return cost_child
+
+            cost_left = descend_cost(node.left)
+            cost_right = descend_cost(node.right)
+
+            if cost < cost_left and cost < cost_right:
+                break
+            node = node.left if cost_left < cost_right else node.right
+
+        # new branch between sibling & its old parent
+        sibling = node
+        old_parent = sibling.parent
+        branch = TreeNode(sibling.box.union(box))
+        branch.parent = old_parent
+        branch.left = sibling
+        branch.right = leaf
+        sibling.parent = branch
+        leaf.parent = branch
+
+        if old_parent is None:
+            self.root = branch
+        elif old_parent.left is sibling:
+            old_parent.left = branch
+        else:
+            old_parent.right = branch
+
+        self.refit(old_parent)
+
+    def remove(self, leaf: TreeNode):
+        """ Remove leaf, its sibling takes the place of their parent """
+        if leaf is self.root:
+            self.root = None
+            return
+
+        parent = leaf.parent
+        grand_parent = parent.parent
+        sibling = parent.right if parent.left is leaf else parent.left
+        sibling.parent = grand_parent
+        leaf.parent = None
+
+        if grand_parent is None:
+            self.root = sibling
+        else:
+            if grand_parent.left is parent:
+                grand_parent.left = sibling
+            else:
+                grand_parent.right = sibling
+            self.refit(grand_parent)
+
+    def refit(self, node: TreeNode | None):
+        """ Re-calculate bounds of node & every ancestor """
+        while node is not None:
+            node.box = node.left.box.union(node.right.box)
+            node = node.parent
+
+    def query(self, box: AABB) -> list[Object]:
+        """ Returns every object whose leaf box overlaps the given box """
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if not node.box.overlaps(box):
+                continue
+
+            if node.is_leaf():
+                found.append(node.obj)
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+        return found
+
+    def raycast(self, origin: Vec2, direction: Vec2, max_dist: float, hit_func):
+        """
+        Calls hit_func(obj, max dist) for every object whose leaf box the ray (normalised direction) passes through within max dist.
+        hit_func returns the new max dist, so once something is hit further boxes are skipped
+        """
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            if node.box.ray_distance(origin, direction, max_dist) is None:
+                continue
+
+            if node.is_leaf():
+                max_dist = hit_func(node.obj, max_dist)
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+
+    def clear(self):
+        self.root = None
+
+
+class DynamicTree(Broadphase):
+    """
+    Persistent AABB trees, one for moving objects and one for static objects.
+    Moving objects are stored with a fattened box and are only re-inserted once they leave it. Static objects are inserted once and never moved.
+    """
+    def __init__(self, margin=DEF_AABB_MARGIN):
+        self.margin: float = margin
+        self.dynamic_tree = AABBTree()
+        self.static_tree = AABBTree()
+        self.leaves: dict[Object, tuple[AABBTree, TreeNode]] = {}
+
+    def add(self, obj: Object, box: AABB):
+        """ Insert object into the static or dynamic tree (fattening box if dynamic) """
+        tree = self.static_tree if obj.static else self.dynamic_tree
+        if not obj.static:
+            box = box.fatten(self.margin)
+        self.leaves[obj] = (tree, tree.insert(obj, box))
+
+    def remove(self, obj: Object):
+        tree, leaf = self.leaves.pop(obj)
+        tree.remove(leaf)
+
+    def sync(self, objects: list[Object], boxes: list[AABB]):
+        """ Add new objects, remove deleted objects & re-insert moving objects that left their fat box """
+        present = set(objects)
+        for obj in [o for o in self.leaves if o not in present]:
+            self.remove(obj)
+
+        for obj, box in zip(objects, boxes):
+            entry = self.leaves.get(obj)
+            if entry is None:
+                self.add(obj, box)
+                continue
+
+            tree, leaf = entry
+            if tree is self.dynamic_tree and not leaf.box.contains(box):
+                tree.remove(leaf)
+                leaf.box = box.fatten(self.margin)
+                tree.insert_leaf(leaf)
+
+    def find_pairs(self, objects: list[Object]) -> list[tuple[Object, Object]]:
+        boxes = [obj.get_aabb() for obj in objects]
+        self.sync(objects, boxes)
+        order = {obj: i for i, obj in enumerate(objects)}
+        pairs = []
+
+        for ib, b in enumerate(objects):
+            if b.static:
+                continue  # static objects are found by the moving objects querying the static tree
+            box = boxes[ib]
+
+            for a in self.dynamic_tree.query(box):
+                ia = order[a]
+                if ia < ib and not a.should_ignore_collision(b) and boxes[ia].overlaps(box):
+                    pairs.append((a, b))
+
+            for a in self.static_tree.query(box):
+                if not a.should_ignore_collision(b):
+                    pairs.append((a, b) if order[a] < ib else (b, a))
+        return pairs
+
+    def __repr__(self):
+        return f'DynamicTree(margin: {self.margin}, leaves: {len(self.leaves)})'
+
+
+class Endpoint:
+    """ Min or max edge of an objects bounds along one axis """
+    def __init__(self, obj: Object, is_min: bool):
+        self.obj: Object = obj
+        self.is_min: bool = is_min
+        self.value: float = 0.0
+
+    def sort_key(self) -> tuple[float, int]:
+        """ Min endpoints sort before max endpoints of the same value, so touching bounds count as overlapping """
+        return self.value, 0 if self.is_min else 1
+
+    def __repr__(self):
+        return f'Endpoint({"min" if self.is_min else "max"}: {self.value})'
+
+
+class SweepAndPrune(Broadphase):
+    """
+    Keeps sorted lists of bounds endpoints along x and y between steps, along with the set of overlapping pairs.
+    Each step the lists are repaired with an insertion sort (near linear when objects barely move), pairs are added / removed as endpoints swap.
+    """
+    def __init__(self, rebuild_ratio=0.5):
+        self.rebuild_ratio: float = rebuild_ratio  # rebuild from scratch if more than this fraction of objects are new
+        self.axes: list[list[Endpoint]] = [[], []]
+        self.endpoints: dict[Object, tuple[Endpoint, Endpoint, Endpoint, Endpoint]] = {}  # x min, x max, y min, y max
+        self.boxes: dict[Object, AABB] = {}
+        self.pairs: set[frozenset[Object]] = set()
+
+    def add(self, obj: Object):
+        eps = (Endpoint(obj, True), Endpoint(obj, False), Endpoint(obj, True), Endpoint(obj, False))
+        self.endpoints[obj] = eps
+        self.axes[0] += eps[:2]
+        self.axes[1] += eps[2:]
+
+    def remove(self, objs: set[Object]):
+        for obj in objs:
+            del self.endpoints[obj]
+            del self.boxes[obj]
+        for i, axis in enumerate(self.axes):
+            self.axes[i] = [ep for ep in axis if ep.obj not in objs]
+        self.pairs = {pair for pair in self.pairs if not (pair & objs)}
+
+    def update_endpoints(self, objects: list[Object]):
+        for obj in objects:
+            box = obj.get_aabb()
+            self.boxes[obj] = box
+            x_min, x_max, y_min, y_max = self.endpoints[obj]
+            x_min.value, x_max.value = box.min.x, box.max.x
+            y_min.value, y_max.value = box.min.y, box.max.y
+
+    def insertion_sort(self, axis: list[Endpoint]):
+        """ Sort axis in place, updating pairs whenever a min & max endpoint swap """
+        for i in range(1, len(axis)):
+            ep = axis[i]
+            key = ep.sort_key()
+            j = i - 1
+
+            while j >= 0 and key < axis[j].sort_key():
+                other = axis[j]
+                if ep.is_min and not other.is_min:  # min moved before a max, may have started overlapping
+                    if self.boxes[ep.obj].overlaps(self.boxes[other.obj]):
+                        self.pairs.add(frozenset((ep.obj, other.obj)))
+                elif not ep.is_min and other.is_min:  # max moved before a min, no longer overlapping
+                    self.pairs.discard(frozenset((ep.obj, other.obj)))
+
+                axis[j + 1] = other
+                j -= 1
+            axis[j + 1] = ep
+
+    def rebuild(self):
+        """ Sort both axes from scratch & find all pairs by sweeping along x """
+        for axis in self.axes:
+            axis.sort(key=Endpoint.sort_key)
+
+        self.pairs.clear()
+        active: list[Object] = []
+        for ep in self.axes[0]:
+            if ep.is_min:
+                box = self.boxes[ep.obj]
+                for obj in active:
+                    if box.overlaps(self.boxes[obj]):
+                        self.pairs.add(frozenset((ep.obj, obj)))
+                active.append(ep.obj)
+            else:
+                active.remove(ep.obj)
+
+    def find_pairs(self, objects: list[Object]) -> list[tuple[Object, Object]]:
+        removed = set(self.endpoints).difference(objects)
+        if removed:
+            self.remove(removed)
+
+        new_objs = [obj for obj in objects if obj not in self.endpoints]
+        for obj in new_objs:
+            self.add(obj)
+
+        self.update_endpoints(objects)
+        if len(new_objs) > len(objects) * self.rebuild_ratio:
+            self.rebuild()
+        else:
+            for axis in self.axes:
+                self.insertion_sort(axis)
+
+        order = {obj: i for i, obj in enumerate(objects)}
+        pairs = []
+        for pair in self.pairs:
+            a, b = sorted(pair, key=order.get)
+            if not a.should_ignore_collision(b):
+                pairs.append((a, b))
+        pairs.sort(key=lambda p: (order[p[0]], order[p[1]]))  # set order is not deterministic
+        return pairs
+
+    def __repr__(self):
+        return f'SweepAndPrune(objects: {len(self.endpoints)}, pairs: {len(self.pairs)})'
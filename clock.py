@@ -0,0 +1,10 @@
+class Clock:
+    """ Simulation time in seconds, advanced by the fixed step instead of read from the wall clock, so runs can be fast-forwarded & replayed """
+    def __init__(self, time=0.0):
+        self.time: float = time
+
+    def tick(self, dt: float):
+        self.time += dt
+
+    def __repr__(self):
+        return f'Clock(time: {self.time})'
@@ -1,9 +1,37 @@
-import pygame as pg
+import importlib
+import importlib.util
+
 from Vec2 import Vec2, EPSILON
 from mat2 import Mat2
 import math
 
 
+class LazyModule:
+    """ Stands in for a module, which is only imported once one of its attributes is used """
+    def __init__(self, name: str):
+        self.name: str = name
+        self.module = None
+
+    def __getattr__(self, attr: str):
+        """ Only called for attributes not yet cached on the instance """
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        value = getattr(self.module, attr)
+        self.__dict__[attr] = value  # later uses are plain attribute lookups (hot numpy kernels)
+        return value
+
+    def __repr__(self):
+        return f'LazyModule({self.name}, loaded: {self.module is not None})'
+
+
+def lazy_import(name: str) -> LazyModule | None:
+    """ LazyModule of an optional dependency, None if it is not installed (checked without importing it) """
+    return LazyModule(name) if importlib.util.find_spec(name) is not None else None
+
+
+pg = LazyModule('pygame')  # only needed for rendering & input, the physics can be used without loading it
+
+
 def do_lines_cross(line_a: tuple[Vec2, Vec2], line_b: tuple[Vec2, Vec2]) -> bool:
     """ Returns whether the two given lines intersect / cross one another """
     a1, a2 = line_a
@@ -72,6 +100,7 @@ def greater_than(a: float, b: float):
 class Forces:
     PENETRATION_ALLOWANCE = 0.05  # aka slop
     POSITIONAL_CORRECTION = 0.2  # 20% - 80%
+    RESOLVE_TOLERANCE = 0.1  # solver stops once a pass changes no relative velocity by more than this
     BIAS_RELATIVE = 0.95
     BIAS_ABSOLUTE = 0.01
     INF_MASS = 0
@@ -98,6 +127,8 @@ class Values:
     FPS = 60
     DT = 1 / FPS
     RESTING = (Forces.GRAVITY * DT).length_sq() + EPSILON
+    RESTING_ANGULAR = 0.01  # angular velocity squared
+    SLEEP_TIME = 0.5  # seconds an island must be resting before it sleeps
 
     SCREEN_WIDTH = 300
     SCREEN_HEIGHT = 200
@@ -2,8 +2,10 @@ import random
 
 from constants import *
 
-from manifold import Manifold
+from broadphase import Broadphase
+from world import World
 from water import Water
+from clock import Clock
 from objects import Object, Circle, Polygon, SquarePoly
 from Vec2 import Vec2
 from particle import Particle
@@ -25,94 +27,41 @@ def hold_object(obj: Object, mp: Vec2):
     obj.apply_force(force * (obj.inv_mass * 100))
 
 
-class Group:
-    """ Group to store instances of different layers in order of lowest to highest. Optimised for retrieval of objects. """
-    def __init__(self, add_objects=None, group_type=None):
-        self.layer_nums = {}  # amount of stored objects with layer x
-        self.objects = []  # ordered by layers, low - high
-        self.group_type = group_type  # type strong group
+def default_objects() -> list[Object]:
+    """ The starting scene """
+    o1 = Circle(Vec2(90, 60), 7)
+    o2 = Circle(Vec2(60, 60))
+    o3 = Circle(Vec2(200, 30), 10)
+    o4 = Circle(Vec2(120, 100), 20)
+    pa = Polygon(Vec2(125, 40), [Vec2(0, 0), Vec2(15, 0), Vec2(15, 20), Vec2(0, 15)])
+    pb = Polygon(Vec2(100, 10), [Vec2(0, 0), Vec2(15, 0), Vec2(15, 15)])
 
-        if add_objects is not None:
-            self.add_mul(add_objects)
+    g1 = SquarePoly(Vec2(50, 160), size=Vec2(200, 10), static=True)
+    g2 = SquarePoly(Vec2(50, 75), size=Vec2(10, 100), static=True)
+    g3 = SquarePoly(Vec2(250, 75), size=Vec2(10, 100), static=True)
+    sc = Circle(Vec2(170, 80), 25, static=True)
+    return [o1, o2, o3, o4, pa, pb, g1, g2, g3, sc]
 
-    def set_type(self, obj):
-        """ set group type if not set """
-        if self.group_type is None:
-            self.group_type = get_type_of(obj)
 
-    def add(self, obj):
-        """ Add new layer to dict (if needed), insert object at end of objects' layer in list """
-        self.set_type(obj)
-
-        if get_type_of(obj) == self.group_type:
-            l = obj.layer
-            if l not in self.layer_nums:
-                self.layer_nums[l] = 0
-
-            index = sum(amnt for layer, amnt in self.layer_nums.items() if layer <= l)  # points to end of layer section in list
-
-            self.objects.insert(index, obj)
-            self.layer_nums[obj.layer] += 1
-        else:
-            print(f'WARN: Could not add object "{obj}" to group of a different group type: "{self.group_type}"')
-
-    def add_mul(self, lis: list):
-        for obj in lis:
-            self.add(obj)
-
-    def remove_at_index(self, inx, obj=None):
-        """ Fast method of removal. Returns successful deletion """
-        if inx < len(self.objects):
-            obj = obj if obj is not None else self.objects[inx]
-            self.layer_nums[obj.layer] -= 1
-
-            if self.layer_nums[obj.layer] <= 0:
-                self.layer_nums.pop(obj.layer)
-
-            del self.objects[inx]
-            return True
-        return False
-
-    def remove_obj(self, o):
-        """ Slow method of removal. Returns success on location, and deletion of object """
-        try:
-            found = [[i, obj] for i, obj in enumerate(self.objects) if obj == o][0]
-            return self.remove_at_index(*found)
-        except IndexError:
-            return False
-
-    def clear(self):
-        """ Clears the entire group & resets the type. """
-        self.layer_nums.clear()
-        self.objects.clear()
-        self.group_type = None
-
-    def render_all(self, screen: pg.Surface):
-        for obj in self.objects:
-            obj.render(screen)
-
-    def __repr__(self):
-        return f'Group(type: ({self.group_type}), objects: {len(self.objects)}, layer/s: {len(self.layer_nums.keys())})'
+def default_water(clock: Clock) -> Water:
+    return Water(Vec2(50, 30), Vec2(150, 50), clock)
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, broadphase: Broadphase = None, batch_narrow_phase=False, batch_solve=False, dt=Values.DT):
         self.running = True
         self.keys = pg.key.get_pressed()
         self.m_keys = pg.mouse.get_pressed()
-        self.resolve_iterations = 8  # higher = more stable but less performant
         self.mp = get_mp()
 
         self.canvas_screen = pg.Surface(Vec2(Values.SCREEN_WIDTH, Values.SCREEN_HEIGHT).get())
         self.final_screen = pg.display.get_surface()
 
-        # objects
-        self.objects_group = Group()
-        self.particles_group = Group()
+        # physics, everything simulated lives in the world
+        self.world = World(broadphase, batch_narrow_phase, batch_solve, dt=dt)
+        self.world.water = default_water(self.world.clock)
+        self.world.keep_previous = True  # renders interpolate between the last 2 steps
         self.holding_obj: Object | None = None
-        self.collisions: list[Manifold] = []
-
-        self.water = Water(Vec2(50, 30), Vec2(150, 50))
 
         self.reset_objects()
 
@@ -159,8 +108,8 @@ class Game:
     def mouse_r_down(self):
         p = self.mp.clone()
         for _ in range(8):
-            self.particles_group.add(
-                Particle(p, velocity=Vec2(random.randrange(-50, 50), random.randrange(-100, -50)),
+            self.world.particles_group.add(
+                Particle(p, self.world.clock, velocity=Vec2(random.randrange(-50, 50), random.randrange(-100, -50)),
                          colour=[random.randrange(0, 255) for _ in range(3)], lifetime=random.random() + 0.4)
             )
 
@@ -168,36 +117,22 @@ class Game:
             c = Circle(p, random.randint(5, 12))
             c.orientation = random.randint(0, 360)
             c.colour = [random.randrange(0, 255) for _ in range(3)]
-            self.objects_group.add(c)
+            self.world.objects_group.add(c)
 
     def mouse_r_up(self):
         pass
 
     def mouse_l_down(self):
-        for obj in self.objects_group.objects:
-            if not obj.static and obj.is_point_in_obj(self.mp):
-                self.holding_obj = obj
-                break
+        found = self.world.world_query.query_point(self.mp, include_static=False)
+        if found:
+            self.holding_obj = found[0]
 
     def mouse_l_up(self):
         if self.holding_obj is not None:
             self.holding_obj = None
 
     def reset_objects(self):
-        o1 = Circle(Vec2(90, 60), 7)
-        o2 = Circle(Vec2(60, 60))
-        o3 = Circle(Vec2(200, 30), 10)
-        o4 = Circle(Vec2(120, 100), 20)
-        pa = Polygon(Vec2(125, 40), [Vec2(0, 0), Vec2(15, 0), Vec2(15, 20), Vec2(0, 15)])
-        pb = Polygon(Vec2(100, 10), [Vec2(0, 0), Vec2(15, 0), Vec2(15, 15)])
-
-        g1 = SquarePoly(Vec2(50, 160), size=Vec2(200, 10), static=True)
-        g2 = SquarePoly(Vec2(50, 75), size=Vec2(10, 100), static=True)
-        g3 = SquarePoly(Vec2(250, 75), size=Vec2(10, 100), static=True)
-        sc = Circle(Vec2(170, 80), 25, static=True)
-
-        self.objects_group.clear()
-        self.objects_group.add_mul([o1, o2, o3, o4, pa, pb, g1, g2, g3, sc])
+        self.world.set_objects(default_objects())
 
     def rotate_screen_blit(self, image, angle, pos: Vec2):
         """ Temporary """
@@ -207,77 +142,24 @@ class Game:
 
         self.canvas_screen.blit(rotated_image, new_rect)
 
-    def init_collisions(self, objs: list):
-        """ Iterate over all objects given and check if they're colliding. If so, fill manifold values & add it to collision list """
-        for ia, a in enumerate(objs):
-            for b in objs[ia + 1:]:  # prevent duplicate checks (and self checks)
-                if a.should_ignore_collision(b):
-                    continue
-
-                man = Manifold(a, b)
-                man.solve_collision()
-
-                if man.contact_count > 0:
-                    self.collisions.append(man)
-
-    def update_objects(self):
-        objects = self.objects_group.objects
-
-        self.collisions.clear()
-        self.init_collisions(objects)
-
-        # apply rest of velocity from last frame
-        for obj in objects:
-            obj.update_velocity(Values.DT)
-
-        # resolve collisions, apply impulses
-        for it in range(self.resolve_iterations):
-            for coll in self.collisions:
-                coll.resolve_collision()
-
-        # apply velocity
-        for obj in objects:
-            obj.update(Values.DT)
-
-        # correct positions
-        for coll in self.collisions:
-            coll.positional_correction()
-
-        # conclusion
-        for i, obj in enumerate(objects):
-            obj.force.set(0, 0)
-            obj.torque = 0
-
-            if obj.is_out_of_bounds():
-                self.objects_group.remove_at_index(i, obj)
-
-    def update_particles(self):
-        for i, part in enumerate(self.particles_group.objects):
-            if part.should_del():
-                self.particles_group.remove_at_index(i, part)
-            part.update(Values.DT)
-
     def update(self):
         if self.holding_obj is not None:
             hold_object(self.holding_obj, self.mp)
 
-        self.water.check_collision(self.objects_group.objects)
-        self.water.update()
-
-        self.update_particles()
-        self.update_objects()
+        self.world.step()
 
-    def render(self):
+    def render(self, alpha=1.0):
+        """ alpha: how far between the previous & current physics step to draw bodies """
         self.final_screen.fill(Colours.BG_COL)
         self.canvas_screen.fill(Colours.BG_COL)
 
         # render here
-        self.water.render(self.canvas_screen)
+        self.world.water.render(self.canvas_screen)
 
-        self.particles_group.render_all(self.canvas_screen)
-        self.objects_group.render_all(self.canvas_screen)
+        self.world.particles_group.render_all(self.canvas_screen, alpha)
+        self.world.objects_group.render_all(self.canvas_screen, alpha)
 
-        for coll in self.collisions:
+        for coll in self.world.collisions:
             coll.render(self.canvas_screen)
 
         # outline
@@ -294,10 +176,12 @@ class Game:
         self.final_screen.blit(scaled, (0, 0))
         pg.display.flip()
 
-    def main_loop(self):
-        """ Called every on frame """
+    def main_loop(self, steps=1, alpha=1.0, render=True):
+        """ Called every on frame, steps the physics the given number of times (0 just handles input) & renders alpha of the way into the last step """
         self.mp = get_mp()
 
         self.events()
-        self.update()
-        self.render()
+        for _ in range(steps):
+            self.update()
+        if render:
+            self.render(alpha)
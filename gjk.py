@@ -0,0 +1,266 @@
+import sys
+
+from constants import *
+from Vec2 import Vec2, EPSILON_SQ
+from objects import Object, Circle, Polygon
+from manifold import Manifold, clip_incident_face, find_incident_face
+
+# GJK (distance between convex shapes) & EPA (penetration of overlapping convex shapes), both only use support points
+# so they cost O(n + m) per iteration, instead of the O(n * m) of SAT. Circles are handled as their centre point (core),
+# with the radius added afterwards
+
+MAX_ITERATIONS = 32
+EPA_MAX_ITERATIONS = 2 * Polygon.MAX_VERTEX_COUNT + 8  # minkowski difference of 2 polygons has up to both vertex counts of edges
+TOLERANCE = 1e-9  # relative, GJK stops once the distance improves less than this
+EPA_TOLERANCE = 1e-6  # EPA stops once the polytope expands less than this
+
+
+class SupportPoint:
+    """ Point of the minkowski difference (a - b), with the points (& vertex indexes) of a & b that made it """
+    __slots__ = ('point', 'a', 'b', 'a_inx', 'b_inx', 'weight')
+
+    def __init__(self, a: Vec2, b: Vec2, a_inx: int, b_inx: int):
+        self.point: Vec2 = a - b
+        self.a: Vec2 = a
+        self.b: Vec2 = b
+        self.a_inx: int = a_inx
+        self.b_inx: int = b_inx
+        self.weight: float = 1.0  # barycentric weight in the simplex's closest point
+
+    def __repr__(self):
+        return f'SupportPoint({self.point})'
+
+
+def get_core_radius(obj: Object) -> float:
+    """ Radius around the core shape (circles are a point with a radius, polygons have none) """
+    return obj.radius if isinstance(obj, Circle) else 0.0
+
+
+def get_core_support(obj: Object, direction: Vec2) -> tuple[Vec2, int]:
+    """ Support point of the object's core in world space, with its vertex index (-1 for circles) """
+    if isinstance(obj, Circle):
+        return obj.pos, -1
+
+    inx = obj.get_support_index(obj.get_inv_mat2().mul_vec(direction))  # direction into model space
+    return obj.get_world_vertices()[inx], inx
+
+
+def get_minkowski_support(a: Object, b: Object, direction: Vec2) -> SupportPoint:
+    """ Support point of (a - b) along direction """
+    sa, a_inx = get_core_support(a, direction)
+    sb, b_inx = get_core_support(b, direction.negate())
+    return SupportPoint(sa, sb, a_inx, b_inx)
+
+
+def closest_on_segment(simplex: list[SupportPoint]) -> Vec2:
+    """ Point on the simplex segment closest to the origin. Removes the point not needed to make it & sets weights """
+    sa, sb = simplex
+    edge: Vec2 = sb.point - sa.point
+    edge_sq: float = edge.length_sq()
+    t: float = -sa.point.dot(edge) / edge_sq if edge_sq > EPSILON_SQ else 0.0
+
+    if t <= 0:
+        simplex.remove(sb)
+        sa.weight = 1.0
+        return sa.point.clone()
+    if t >= 1:
+        simplex.remove(sa)
+        sb.weight = 1.0
+        return sb.point.clone()
+
+    sa.weight, sb.weight = 1 - t, t
+    return sa.point + edge * t
+
+
+def closest_on_triangle(simplex: list[SupportPoint]) -> Vec2:
+    """ Point on the simplex triangle closest to the origin (origin if within). Removes the points not needed to make it & sets weights """
+    pa, pb, pc = (s.point for s in simplex)
+    area: float = (pb - pa).cross_vec(pc - pa)
+
+    if abs(area) > EPSILON:
+        # barycentric coordinates of the origin
+        wa: float = pb.cross_vec(pc) / area
+        wb: float = pc.cross_vec(pa) / area
+        wc: float = pa.cross_vec(pb) / area
+        if wa >= 0 and wb >= 0 and wc >= 0:
+            for s, w in zip(simplex, (wa, wb, wc)):
+                s.weight = w
+            return Vec2()
+
+    # origin is outside, closest point is on an edge
+    best: tuple[float, list[SupportPoint], Vec2, list[float]] | None = None
+    for i in range(3):
+        edge = [simplex[i], simplex[(i + 1) % 3]]
+        point = closest_on_segment(edge)
+        dist_sq = point.length_sq()
+        if best is None or dist_sq < best[0]:
+            best = dist_sq, edge, point, [s.weight for s in edge]
+
+    _, edge, point, weights = best
+    simplex[:] = edge
+    for s, w in zip(edge, weights):
+        s.weight = w
+    return point
+
+
+def gjk(a: Object, b: Object) -> tuple[bool, list[SupportPoint], Vec2]:
+    """
+    GJK on the objects' cores. Returns whether the cores overlap, the final simplex & the point of (a - b) closest to the origin
+    (the vector between the closest points of the cores, b to a)
+    """
+    direction: Vec2 = a.pos - b.pos
+    if direction.length_sq() <= EPSILON_SQ:
+        direction.set(1, 0)
+
+    simplex: list[SupportPoint] = [get_minkowski_support(a, b, direction)]
+    closest: Vec2 = simplex[0].point.clone()
+
+    for _ in range(MAX_ITERATIONS):
+        dist_sq: float = closest.length_sq()
+        if dist_sq <= EPSILON_SQ:
+            return True, simplex, closest
+
+        new = get_minkowski_support(a, b, closest.negate())
+        if dist_sq - closest.dot(new.point) <= TOLERANCE * dist_sq:
+            return False, simplex, closest  # no more progress towards the origin, closest found
+        if any(s.point == new.point for s in simplex):
+            return False, simplex, closest
+
+        simplex.append(new)
+        closest = closest_on_segment(simplex) if len(simplex) == 2 else closest_on_triangle(simplex)
+        if len(simplex) == 3:
+            return True, simplex, closest  # origin is within the triangle
+    return False, simplex, closest
+
+
+def closest_points(a: Object, b: Object) -> tuple[float, Vec2, Vec2]:
+    """ Closest distance between the objects (0 if overlapping) & the closest point on each. Points are only meaningful when not overlapping """
+    overlap, simplex, closest = gjk(a, b)
+    point_a: Vec2 = Vec2()
+    point_b: Vec2 = Vec2()
+    for s in simplex:
+        point_a.add_scaled_self(s.a, s.weight)
+        point_b.add_scaled_self(s.b, s.weight)
+
+    radius_a, radius_b = get_core_radius(a), get_core_radius(b)
+    dist: float = 0.0 if overlap else closest.length()
+    if dist <= radius_a + radius_b:
+        return 0.0, point_a, point_b
+
+    normal: Vec2 = closest / -dist  # a to b
+    point_a.add_scaled_self(normal, radius_a)
+    point_b.add_scaled_self(normal, -radius_b)
+    return dist - radius_a - radius_b, point_a, point_b
+
+
+def distance(a: Object, b: Object) -> float:
+    """ Closest distance between the objects (0 if overlapping), without needing a Manifold """
+    return closest_points(a, b)[0]
+
+
+def epa(a: Object, b: Object, simplex: list[SupportPoint]) -> tuple[Vec2, float]:
+    """ Expand GJK's final simplex (of overlapping cores) to the edge of (a - b) nearest the origin. Returns the normal (a to b) & penetration """
+    polytope: list[Vec2] = [s.point for s in simplex]
+
+    # cores only touching, GJK may end on a point or edge. Make it a triangle
+    if len(polytope) == 1:
+        polytope.append(get_minkowski_support(a, b, Vec2(1, 0)).point)
+    if len(polytope) == 2:
+        edge = polytope[1] - polytope[0]
+        side = Vec2(edge.y, -edge.x)
+        for direction in (side, side.negate()):
+            point = get_minkowski_support(a, b, direction).point
+            if abs((polytope[1] - polytope[0]).cross_vec(point - polytope[0])) > EPSILON:
+                polytope.append(point)
+                break
+        else:  # flat, nothing to expand
+            normal = b.pos - a.pos
+            return (normal.normalise_self() if normal.length_sq() > EPSILON_SQ else Vec2(1, 0)), 0.0
+
+    # winding must be anti-clockwise for the normals to face outwards (same as Polygon)
+    if (polytope[1] - polytope[0]).cross_vec(polytope[2] - polytope[0]) < 0:
+        polytope[1], polytope[2] = polytope[2], polytope[1]
+
+    normal: Vec2 = Vec2(1, 0)
+    dist: float = 0.0
+    for _ in range(EPA_MAX_ITERATIONS):
+        # edge nearest the origin
+        dist = sys.float_info.max
+        inx: int = 0
+        for i in range(len(polytope)):
+            edge = polytope[(i + 1) % len(polytope)] - polytope[i]
+            edge_normal = Vec2(edge.y, -edge.x).normalise_self()
+            edge_dist = edge_normal.dot(polytope[i])
+            if edge_dist < dist:
+                dist, normal, inx = edge_dist, edge_normal, i
+
+        point = get_minkowski_support(a, b, normal).point
+        if point.dot(normal) - dist <= EPA_TOLERANCE:
+            break
+        polytope.insert(inx + 1, point)
+    return normal, dist
+
+
+def find_aligned_face(poly: Polygon, direction: Vec2) -> tuple[int, float]:
+    """ Face of poly whose (world) normal is most aligned with direction, & the dot product of the two """
+    best_inx: int = 0
+    best_dot: float = -sys.float_info.max
+    for i, normal in enumerate(poly.get_world_normals()[:poly.vertex_count]):
+        dot: float = normal.dot(direction)
+        if dot > best_dot:
+            best_dot = dot
+            best_inx = i
+    return best_inx, best_dot
+
+
+def poly_colliding_poly(m: Manifold, p1: Polygon, p2: Polygon) -> bool:
+    """ GJK / EPA version of manifold.poly_colliding_poly, the EPA normal picks the reference face to clip against """
+    overlap, simplex, _ = gjk(p1, p2)
+    if not overlap:
+        return False
+
+    normal, _ = epa(p1, p2, simplex)
+    face_a_inx, dot_a = find_aligned_face(p1, normal)
+    face_b_inx, dot_b = find_aligned_face(p2, normal.negate())
+    flip: bool = dot_b > dot_a  # EPA's normal is exact, no bias needed (unlike SAT)
+
+    ref_poly, inc_poly = (p2, p1) if flip else (p1, p2)
+    ref_inx: int = face_b_inx if flip else face_a_inx
+    inc_inx: int = find_incident_face(ref_poly, inc_poly, ref_inx)
+    return clip_incident_face(m, ref_poly, inc_poly, ref_inx, inc_inx, flip)
+
+
+def circle_colliding_poly(m: Manifold, c: Circle, p: Polygon) -> bool:
+    """ GJK / EPA version of manifold.circle_colliding_poly """
+    overlap, simplex, closest = gjk(c, p)
+
+    if overlap:  # center within poly
+        normal, depth = epa(c, p, simplex)
+        m.feature = ('face', find_aligned_face(p, normal.negate())[0])
+        m.normal = normal
+        m.penetration = depth + c.radius
+        m.contact_points[0] = (m.normal * c.radius) + c.pos
+        m.contact_count = 1
+        return True
+
+    dist: float = closest.length()
+    if dist >= c.radius:
+        return False
+
+    m.normal = closest / -dist
+    m.penetration = c.radius - dist
+    if len(simplex) == 1:  # vertex closest
+        m.feature = ('vertex', simplex[0].b_inx)
+        m.contact_points[0] = simplex[0].b.clone()
+    else:  # face closest
+        i, j = simplex[0].b_inx, simplex[1].b_inx
+        m.feature = ('face', i if (i + 1) % p.vertex_count == j else j)
+        m.contact_points[0] = c.pos + (m.normal * c.radius)
+    m.contact_count = 1
+    return True
+
+
+def poly_colliding_circle(m: Manifold, p: Polygon, c: Circle) -> bool:
+    val = circle_colliding_poly(m, c, p)
+    m.normal.negate_self()  # reverse the normal
+    return val
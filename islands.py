@@ -0,0 +1,78 @@
+import sys
+
+from constants import *
+from objects import Object
+from manifold import Manifold
+
+
+def find_island_roots(objects: list[Object], collisions: list[Manifold]) -> dict[Object, Object]:
+    """ Union-find over the contacts, returns the island root of every awake, non-static object. Static objects do not join islands (they would join everything) """
+    parent: dict[Object, Object] = {obj: obj for obj in objects if obj.is_active()}
+
+    def find(obj: Object) -> Object:
+        while parent[obj] is not obj:
+            parent[obj] = parent[parent[obj]]  # path halving
+            obj = parent[obj]
+        return obj
+
+    for man in collisions:
+        if man.a in parent and man.b in parent:
+            root_a, root_b = find(man.a), find(man.b)
+            if root_a is not root_b:
+                parent[root_b] = root_a
+
+    return {obj: find(obj) for obj in parent}
+
+
+def build_islands(objects: list[Object], collisions: list[Manifold]) -> tuple[list[list[Object]], list[list[Manifold]]]:
+    """ Group awake, non-static objects connected through contacts. Returns the objects & the collisions of each island (same order) """
+    roots = find_island_roots(objects, collisions)
+
+    islands: dict[Object, tuple[list[Object], list[Manifold]]] = {}
+    for obj, root in roots.items():
+        islands.setdefault(root, ([], []))[0].append(obj)
+
+    for man in collisions:
+        root = roots.get(man.a, roots.get(man.b))  # contacts with static (or sleeping) objects belong to the other object's island
+        if root is not None:
+            islands[root][1].append(man)
+
+    return [objs for objs, _ in islands.values()], [colls for _, colls in islands.values()]
+
+
+def wake_touched(collisions: list[Manifold]) -> bool:
+    """ Wake sleeping objects (& their islands) in contact with an awake object. Returns whether any were woken """
+    woken: bool = False
+    for man in collisions:
+        if man.a.is_active() and not man.b.awake:
+            man.b.wake()
+            woken = True
+        elif man.b.is_active() and not man.a.awake:
+            man.a.wake()
+            woken = True
+    return woken
+
+
+def solve_island(collisions: list[Manifold], max_iterations: int, tolerance: float, resting=Values.RESTING) -> int:
+    """ Resolve the island's collisions until the largest velocity change in a pass is below tolerance. Returns iterations used """
+    for it in range(max_iterations):
+        max_change: float = 0.0
+        for coll in collisions:
+            max_change = max(max_change, coll.resolve_collision(resting))
+
+        if max_change < tolerance:
+            return it + 1
+    return max_iterations
+
+
+def update_sleeping(islands: list[list[Object]], dt: float, resting=Values.RESTING, resting_angular=Values.RESTING_ANGULAR):
+    """ Islands which have all been resting for long enough are put to sleep together """
+    for island in islands:
+        min_rest_time = sys.float_info.max
+        for obj in island:
+            obj.update_rest_time(dt, resting, resting_angular)
+            min_rest_time = min(min_rest_time, obj.rest_time)
+
+        if min_rest_time >= Values.SLEEP_TIME:
+            for obj in island:
+                obj.sleep(island)
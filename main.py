@@ -1,12 +1,28 @@
+"""
+usage: python main.py [--turbo SPEED] [--physics-hz HZ] [--display-fps FPS] [--headless STEPS]
+--turbo runs the physics SPEED times faster than real time, many steps per rendered frame.
+--physics-hz sets the fixed step rate separately from the display rate, bodies are drawn interpolated between the last 2 steps.
+--headless steps the default scene as fast as possible without a window & reports steps/sec.
+"""
+import argparse
 import time
 
-from game import Game
+from game import Game, default_objects, default_water
+from world import World
 from constants import *
 
+MAX_FRAME_TIME = 0.2  # avoid spiral of death, most real time a frame will catch up on
+REPORT_INTERVAL = 1.0  # seconds between steps/sec reports
+MAX_SKIPPED_FRAMES = 4  # renders skipped in a row at most, while stepping is behind
+
 game: Game | None = None
 
 
-def main():
+def run_window(speed: float, physics_hz: float, display_fps: float):
+    """
+    Fixed time steps at speed times real time, rendering at most display fps (once per frame however many steps were taken).
+    Bodies are drawn between the last 2 steps by the time left in the accumulator, rendering is skipped while stepping can not keep up
+    """
     global game
 
     pg.init()
@@ -14,31 +30,80 @@ def main():
         Values.SCREEN_WIDTH * Values.RES_MUL,
         Values.SCREEN_HEIGHT * Values.RES_MUL))
 
-    game = Game()
+    game = Game(dt=1 / physics_hz)
+    dt = game.world.dt
 
     accumulator = 0
-    frame_start = time.time()
+    frame_time = 1 / display_fps
+    frame_start = time.perf_counter()
+    report_start = frame_start
+    frames = steps_taken = skipped = 0
+    behind = False
 
     # time stepping for deterministic physics
     while game.running:
-        t = time.time()
-
-        accumulator += t - frame_start
+        t = time.perf_counter()
+        accumulator += min(t - frame_start, MAX_FRAME_TIME) * speed
         frame_start = t
 
-        # avoid spiral of death
-        accumulator = min(0.2, accumulator)
+        steps = int(accumulator / dt)
+        accumulator -= steps * dt
+        render = not behind or skipped >= MAX_SKIPPED_FRAMES
+        game.main_loop(steps, alpha=accumulator / dt, render=render)
+
+        behind = time.perf_counter() - t > frame_time  # last frame took too long, skip the next render to catch up
+        skipped = 0 if render else skipped + 1
+        frames += render
+        steps_taken += steps
+        if t - report_start >= REPORT_INTERVAL:
+            elapsed = t - report_start
+            pg.display.set_caption("{} - fps: {:.1f}, steps/sec: {:.0f}".format("2d physics", frames / elapsed, steps_taken / elapsed))
+            report_start = t
+            frames = steps_taken = 0
+
+        # throttle rendering to the display rate
+        wait = frame_time - (time.perf_counter() - t)
+        if wait > 0:
+            time.sleep(wait)
 
-        while accumulator >= Values.DT:
-            current_fps = Values.FPS / ((accumulator - (t - frame_start)) * Values.FPS)
-            pg.display.set_caption("{} - fps: {:.3f}".format("2d physics", current_fps))
+    pg.quit()
 
-            accumulator -= Values.DT
-            game.main_loop()
 
-            time.sleep(Values.DT * .5)  # give cpu a little break?
+def run_headless(steps: int, physics_hz: float):
+    """ Step the default scene as fast as the cpu allows (no window or input), reporting steps/sec """
+    world = World(dt=1 / physics_hz)
+    chunk: int = max(1, round(physics_hz))  # about a simulated second of steps between reports
+    world.water = default_water(world.clock)
+    world.set_objects(default_objects())
 
-    pg.quit()
+    start = report_start = time.perf_counter()
+    report_steps = 0
+    while world.steps < steps:
+        world.step(min(chunk, steps - world.steps))
+
+        t = time.perf_counter()
+        if t - report_start >= REPORT_INTERVAL:
+            print('steps: {}/{}, steps/sec: {:.0f}'.format(world.steps, steps, (world.steps - report_steps) / (t - report_start)))
+            report_start = t
+            report_steps = world.steps
+
+    elapsed = time.perf_counter() - start
+    print('done {} steps ({:.1f}s simulated) in {:.2f}s, steps/sec: {:.0f}'.format(
+        world.steps, world.clock.time, elapsed, world.steps / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='2d physics')
+    parser.add_argument('--turbo', type=float, default=1.0, metavar='SPEED', help='simulation speed, multiple of real time')
+    parser.add_argument('--physics-hz', type=float, default=Values.FPS, metavar='HZ', help='physics steps per simulated second')
+    parser.add_argument('--display-fps', type=float, default=Values.FPS, metavar='FPS', help='most frames rendered per second')
+    parser.add_argument('--headless', type=int, metavar='STEPS', help='run STEPS steps without a window, as fast as possible')
+    args = parser.parse_args()
+
+    if args.headless is not None:
+        run_headless(args.headless, args.physics_hz)
+    else:
+        run_window(args.turbo, args.physics_hz, args.display_fps)
 
 
 if __name__ == "__main__":
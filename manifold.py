@@ -2,7 +2,8 @@ import sys
 
 from constants import *
 from Vec2 import Vec2
-from objects import Object, Circle, Polygon
+from aabb import AABB
+from objects import Object, Circle, Polygon, SquarePoly
 
 # fixed: second object (b) appears to gain velocity exponentially when colliding (object type disregarded)
 # fixed: Poly:Poly collision does not seem to detect every collision (after rotation was implemented)
@@ -14,72 +15,134 @@ from objects import Object, Circle, Polygon
 
 class Manifold:
     """ 'A collection of points that represents an area in space' """
-    def __init__(self, a: Object, b: Object):
+    def __init__(self, a: Object, b: Object, axis_cache: 'AxisCache | None' = None):
         self.a: Object = a
         self.b: Object = b
+        self.axis_cache: AxisCache | None = axis_cache  # last step's separating axes of polygon pairs
         self.normal: Vec2 = Vec2()
         self.penetration: float = 0
 
         self.contact_count: int = 0
         self.contact_points: list[Vec2] = [Vec2(), Vec2()]
+        self.feature: tuple = ()  # which faces / vertices are touching, identifies the same contact across steps
 
-        self.jump_table = [
-            [poly_colliding_poly, poly_colliding_circle],
-            [circle_colliding_poly, circle_colliding_circle]
-        ]
+        # impulses applied per contact, split into along the normal & along the tangent (normal rotated -90 degrees)
+        self.normal_impulses: list[float] = [0.0, 0.0]
+        self.tangent_impulses: list[float] = [0.0, 0.0]
+        self.warm_impulses: list[float] = [0.0, 0.0]  # normal impulse from warm starting that has not been taken back
+        self._scratch: tuple[Vec2, ...] = tuple(Vec2() for _ in range(5))  # re-used by resolve_collision
 
     def solve_collision(self):
         """
         Fills necessary values of this class (normal, pen, contact points) depending upon the types of Objects that are colliding
         """
-        a = int(isinstance(self.a, Circle))
-        b = int(isinstance(self.b, Circle))
+        a = get_shape_index(self.a)
+        b = get_shape_index(self.b)
 
         # execute collision function
-        self.jump_table[a][b](self, self.a, self.b)
+        jump_table[a][b](self, self.a, self.b)
 
     def get_relative_velocity(self, ra: Vec2, rb: Vec2) -> Vec2:
         """ Return relative velocity (including angular vel) of objects """
-        return ((self.b.velocity - rb.cross_fl(self.b.angular_velocity)) -
-                (self.a.velocity - ra.cross_fl(self.a.angular_velocity)))
+        return self.get_relative_velocity_into(ra, rb, Vec2())
+
+    def get_relative_velocity_into(self, ra: Vec2, rb: Vec2, out: Vec2) -> Vec2:
+        """ Relative velocity (including angular vel) of objects, written into out. Returns out """
+        a, b = self.a, self.b
+        out.x = (b.velocity.x - rb.y * b.angular_velocity) - (a.velocity.x - ra.y * a.angular_velocity)
+        out.y = (b.velocity.y - rb.x * -b.angular_velocity) - (a.velocity.y - ra.x * -a.angular_velocity)
+        return out
+
+    def get_key(self) -> tuple:
+        """ Identifies this contact between the same objects & features across steps """
+        return self.a, self.b, self.feature
+
+    def accumulate_impulse(self, i: int, impulse: Vec2):
+        """ Add applied impulse to contact i's totals """
+        n = self.normal
+        self.normal_impulses[i] += impulse.x * n.x + impulse.y * n.y
+        self.tangent_impulses[i] += impulse.x * n.y - impulse.y * n.x
+
+    def warm_start(self, normal_impulses: list[float], tangent_impulses: list[float], factor: float):
+        """ Re-apply (a fraction of) the impulses from the same contact last step, so the solver starts closer to the answer """
+        a, b, n = self.a, self.b, self.normal
+        rel_a, rel_b, _, _, impulse = self._scratch
 
-    def resolve_collision(self):
-        """ Apply impulse on colliding objects to solve collisions """
+        for i in range(self.contact_count):
+            jn = normal_impulses[i] * factor
+            jt = tangent_impulses[i] * factor
+            if jn == 0 and jt == 0:
+                continue
+
+            impulse.set(n.x * jn + n.y * jt, n.y * jn - n.x * jt)
+            self.contact_points[i].sub_into(a.pos, rel_a)
+            self.contact_points[i].sub_into(b.pos, rel_b)
+            a.apply_impulse(impulse, rel_a, -1.0)
+            b.apply_impulse(impulse, rel_b)
+
+            self.normal_impulses[i] += jn
+            self.tangent_impulses[i] += jt
+            self.warm_impulses[i] = max(jn, 0.0)
+
+    def remove_excess_impulse(self, i: int, impulse_scalar: float) -> float:
+        """ Take back warm start impulse along the normal that is separating contact i (never more than was warm started). Returns impulse removed """
+        impulse_scalar = min(impulse_scalar, self.warm_impulses[i])
+        rel_a, rel_b, _, _, impulse = self._scratch
+
+        impulse.set(self.normal.x * impulse_scalar, self.normal.y * impulse_scalar)
+        self.a.apply_impulse(impulse, rel_a)
+        self.b.apply_impulse(impulse, rel_b, -1.0)
+        self.normal_impulses[i] -= impulse_scalar
+        self.warm_impulses[i] -= impulse_scalar
+        return impulse_scalar
+
+    def resolve_collision(self, resting=Values.RESTING) -> float:
+        """ Apply impulse on colliding objects to solve collisions. Returns the largest change in relative velocity made (for convergence) """
         if not self.contact_count:
-            return
+            return 0.0
+
+        a, b, normal = self.a, self.b, self.normal
+        rel_a, rel_b, rel_vel, tan, impulse = self._scratch
+        max_change: float = 0.0
 
         for i in range(self.contact_count):
             # relative values
-            rel_a: Vec2 = self.contact_points[i] - self.a.pos
-            rel_b: Vec2 = self.contact_points[i] - self.b.pos
-            rel_vel: Vec2 = self.get_relative_velocity(rel_a, rel_b)
+            self.contact_points[i].sub_into(a.pos, rel_a)
+            self.contact_points[i].sub_into(b.pos, rel_b)
+            self.get_relative_velocity_into(rel_a, rel_b, rel_vel)
 
-            contact_vel: float = rel_vel.dot(self.normal)
-            if contact_vel > 0:  # separating, do not apply impulse
-                return
+            contact_vel: float = rel_vel.dot(normal)
+            ra_cross_n: float = rel_a.cross_vec(normal)
+            rb_cross_n: float = rel_b.cross_vec(normal)
+            inv_masses: float = a.inv_mass + b.inv_mass + ((ra_cross_n ** 2) * a.inv_inertia) + ((rb_cross_n ** 2) * b.inv_inertia)
 
-            ra_cross_n: float = rel_a.cross_vec(self.normal)
-            rb_cross_n: float = rel_b.cross_vec(self.normal)
-            inv_masses: float = self.a.inv_mass + self.b.inv_mass + ((ra_cross_n ** 2) * self.a.inv_inertia) + ((rb_cross_n ** 2) * self.b.inv_inertia)
+            if contact_vel > 0:  # separating, do not apply impulse
+                if self.warm_impulses[i] > 0:
+                    removed: float = self.remove_excess_impulse(i, contact_vel / inv_masses)  # warm start pushed apart too much
+                    max_change = max(max_change, removed * inv_masses)
+                    continue
+                return max_change
 
             # restitution & rebound
-            is_resting = rel_vel.y ** 2 <= Values.RESTING
-            restitution: float = min(self.a.material.restitution, self.b.material.restitution)  # coefficient of restitution
-            restitution_vec: Vec2 = Vec2(restitution, 0.0 if is_resting else restitution)  # fix jitter-ing objects
-            rebound_vec: Vec2 = -(restitution_vec + 1)
+            is_resting = rel_vel.y ** 2 <= resting
+            restitution: float = min(a.material.restitution, b.material.restitution)  # coefficient of restitution
+            rebound_x: float = -(restitution + 1)
+            rebound_y: float = -((0.0 if is_resting else restitution) + 1)  # fix jitter-ing objects
 
-            # impulse
-            impulse_scalar: Vec2 = Vec2(rebound_vec.x, rebound_vec.y) * contact_vel
-            impulse_scalar /= inv_masses
-            impulse_scalar /= self.contact_count
+            # impulse (scalar per axis)
+            impulse_x: float = rebound_x * contact_vel / inv_masses / self.contact_count
+            impulse_y: float = rebound_y * contact_vel / inv_masses / self.contact_count
 
-            impulse: Vec2 = self.normal * impulse_scalar
-            self.a.apply_impulse(impulse.negate(), rel_a)
-            self.b.apply_impulse(impulse, rel_b)
+            impulse.set(normal.x * impulse_x, normal.y * impulse_y)
+            a.apply_impulse(impulse, rel_a, -1.0)
+            b.apply_impulse(impulse, rel_b)
+            self.accumulate_impulse(i, impulse)
+            max_change = max(max_change, abs(rebound_y * contact_vel) / self.contact_count)
 
             # FRICTION IMPULSE
-            rel_vel: Vec2 = self.get_relative_velocity(rel_a, rel_b)  # re-calculate after applying main impulse
-            tan: Vec2 = rel_vel + (self.normal * -rel_vel.dot(self.normal))  # tangent
+            self.get_relative_velocity_into(rel_a, rel_b, rel_vel)  # re-calculate after applying main impulse
+            rel_vel_n: float = -rel_vel.dot(normal)
+            tan.set(rel_vel.x + normal.x * rel_vel_n, rel_vel.y + normal.y * rel_vel_n)  # tangent
             tan.normalise_self()
 
             impulse_tan_scalar: float = -rel_vel.dot(tan)
@@ -87,26 +150,33 @@ class Manifold:
             impulse_tan_scalar /= self.contact_count
 
             if impulse_tan_scalar != 0:
-                sf = math.sqrt(self.a.static_friction ** 2 + self.b.static_friction ** 2)
+                sf = math.sqrt(a.static_friction ** 2 + b.static_friction ** 2)
 
                 # Coulumb's law
-                if abs(impulse_tan_scalar) < impulse_scalar.x * sf:  # assumed at rest
-                    tan_impulse = tan * impulse_tan_scalar
+                if abs(impulse_tan_scalar) < impulse_x * sf:  # assumed at rest
+                    impulse.set(tan.x * impulse_tan_scalar, tan.y * impulse_tan_scalar)
                 else:  # already moving (energy of activation broken, less friction required)
-                    df = math.sqrt(self.a.dynamic_friction ** 2 + self.b.dynamic_friction ** 2)
-                    tan_impulse = (tan * impulse_scalar) * -df
+                    df = math.sqrt(a.dynamic_friction ** 2 + b.dynamic_friction ** 2)
+                    impulse.set((tan.x * impulse_x) * -df, (tan.y * impulse_y) * -df)
 
-                self.a.apply_impulse(tan_impulse.negate(), rel_a)
-                self.b.apply_impulse(tan_impulse, rel_b)
+                a.apply_impulse(impulse, rel_a, -1.0)
+                b.apply_impulse(impulse, rel_b)
+                self.accumulate_impulse(i, impulse)
+                max_change = max(max_change, impulse.length() * inv_masses)
+        return max_change
 
     def positional_correction(self):
         """ Fix floating point errors (using linear projection) """
         correction = max(self.penetration - Forces.PENETRATION_ALLOWANCE, 0.0) / (self.a.inv_mass + self.b.inv_mass) * Forces.POSITIONAL_CORRECTION
 
-        self.a.pos += self.normal * (-self.a.inv_mass * correction)
-        self.b.pos += self.normal * (self.b.inv_mass * correction)
+        if self.a.inv_mass != 0:  # static objects don't move, keep their cached bounds
+            self.a.pos.add_scaled_self(self.normal, -self.a.inv_mass * correction)
+            self.a.set_moved()
+        if self.b.inv_mass != 0:
+            self.b.pos.add_scaled_self(self.normal, self.b.inv_mass * correction)
+            self.b.set_moved()
 
-    def render(self, screen: pg.Surface):
+    def render(self, screen: 'pg.Surface'):
         for i in range(self.contact_count):
             cp = self.contact_points[i]
             if cp != Vec2(0, 0):
@@ -142,7 +212,8 @@ def circle_colliding_circle(m: Manifold, c1: Circle, c2: Circle) -> bool:
 
 def circle_colliding_poly(m: Manifold, c: Circle, p: Polygon) -> bool:
     # circle center into polygon model space
-    center: Vec2 = p.mat2.transpose().mul_vec(c.pos - p.pos)
+    center: Vec2 = c.pos - p.pos
+    p.mat2.transpose_mul_vec_into(center, center)
 
     separation: float = -sys.float_info.max
     v_inx: int = 0
@@ -157,13 +228,15 @@ def circle_colliding_poly(m: Manifold, c: Circle, p: Polygon) -> bool:
             v_inx = i
 
     # face vertices
+    v2_inx: int = (v_inx + 1) % p.vertex_count  # next face
     v1: Vec2 = p.vertices[v_inx]
-    v2: Vec2 = p.vertices[(v_inx + 1) % p.vertex_count]  # next face
+    v2: Vec2 = p.vertices[v2_inx]
 
     # if center within poly
     if separation < EPSILON:
         m.contact_count = 1
-        m.normal = p.mat2.mul_vec(p.normals[v_inx]).negate()
+        m.feature = ('face', v_inx)
+        m.normal = p.get_world_normals()[v_inx].negate()
         m.contact_points[0] = (m.normal * c.radius) + c.pos
         m.penetration = c.radius
         return True
@@ -179,19 +252,79 @@ def circle_colliding_poly(m: Manifold, c: Circle, p: Polygon) -> bool:
         if center.length_sq_other(v) > c.radius ** 2:
             return False
 
+        m.feature = ('vertex', v_inx if v is v1 else v2_inx)
         m.normal = p.mat2.mul_vec(v - center).normalise_self()
-        m.contact_points[0] = p.mat2.mul_vec(v) + p.pos
+        m.contact_points[0] = p.get_oriented_vert(m.feature[1]).clone()
     else:  # face closest
         n: Vec2 = p.normals[v_inx]
         if (center - v1).dot(n) > c.radius:
             return False
 
-        m.normal = p.mat2.mul_vec(n).negate()
+        m.feature = ('face', v_inx)
+        m.normal = p.get_world_normals()[v_inx].negate()
         m.contact_points[0] = c.pos + (m.normal * c.radius)
     m.contact_count = 1
     return True
 
 
+def circle_colliding_box(m: Manifold, c: Circle, box: Polygon) -> bool:
+    """ circle_colliding_poly against an axis aligned box, done in world space as the box is never rotated """
+    bounds: AABB = box.get_aabb()
+    cx, cy, radius = c.pos.x, c.pos.y, c.radius
+
+    # separation from each face (SquarePoly face order: top, right, bottom, left)
+    separations: tuple[float, ...] = (bounds.min.y - cy, cx - bounds.max.x, cy - bounds.max.y, bounds.min.x - cx)
+    v_inx: int = 0
+    for i in range(1, 4):
+        if separations[i] > separations[v_inx]:
+            v_inx = i
+    separation: float = separations[v_inx]
+    if separation > radius:
+        return False  # too far away, skip collision
+
+    # if center within box
+    if separation < EPSILON:
+        m.contact_count = 1
+        m.feature = ('face', v_inx)
+        m.normal = box.get_world_normals()[v_inx].negate()
+        m.contact_points[0] = (m.normal * c.radius) + c.pos
+        m.penetration = radius
+        return True
+
+    # face vertices
+    verts: list[Vec2] = box.get_world_vertices()
+    v2_inx: int = (v_inx + 1) % 4  # next face
+    v1: Vec2 = verts[v_inx]
+    v2: Vec2 = verts[v2_inx]
+
+    # Determine which voronoi region of the edge center of circle lies within
+    dot1: float = (cx - v1.x) * (v2.x - v1.x) + (cy - v1.y) * (v2.y - v1.y)
+    dot2: float = (cx - v2.x) * (v1.x - v2.x) + (cy - v2.y) * (v1.y - v2.y)
+    m.penetration = radius - separation
+
+    # get vertex furthest within c, or None if face should be used
+    v: Vec2 = v1 if dot1 <= 0 else v2 if dot2 <= 0 else None
+    if v is not None:
+        if (v.x - cx) ** 2 + (v.y - cy) ** 2 > radius ** 2:
+            return False
+
+        m.feature = ('vertex', v_inx if v is v1 else v2_inx)
+        m.normal = Vec2(v.x - cx, v.y - cy).normalise_self()
+        m.contact_points[0] = v.clone()
+    else:  # face closest
+        m.feature = ('face', v_inx)
+        m.normal = box.get_world_normals()[v_inx].negate()
+        m.contact_points[0] = c.pos + (m.normal * radius)
+    m.contact_count = 1
+    return True
+
+
+def box_colliding_circle(m: Manifold, box: Polygon, c: Circle) -> bool:
+    val = circle_colliding_box(m, c, box)
+    m.normal.negate_self()  # reverse the normal
+    return val
+
+
 def poly_colliding_circle(m: Manifold, p: Polygon, c: Circle) -> bool:
     val = circle_colliding_poly(m, c, p)
     m.normal.negate_self()  # reverse the normal (for the love of god do not forget this step)
@@ -199,82 +332,136 @@ def poly_colliding_circle(m: Manifold, p: Polygon, c: Circle) -> bool:
 
 
 def poly_colliding_poly(m: Manifold, p1: Polygon, p2: Polygon) -> bool:
+    cache = m.axis_cache
+    if cache is not None and cache.still_separating(p1, p2):
+        return False  # last step's separating axis still separates, no need to check every face
+
     # check for penetrating faces with both a and b polygons
     face_a_inx, pen_a = find_axis_penetration(p1, p2)
+    if pen_a >= 0.0 and cache is not None:
+        cache.add(p1, p2, False, face_a_inx)
+
     if pen_a < 0.0:
         face_b_inx, pen_b = find_axis_penetration(p2, p1)
+        if pen_b >= 0.0 and cache is not None:
+            cache.add(p1, p2, True, face_b_inx)
+
+        if pen_b < 0.0:
+            return clip_least_penetration(m, p1, p2, face_a_inx, pen_a, face_b_inx, pen_b)
+    return False
+
+
+def poly_colliding_box(m: Manifold, p: Polygon, box: Polygon) -> bool:
+    """ poly_colliding_poly against an axis aligned box, the box's faces are checked with p's bounds """
+    face_a_inx, pen_a = find_axis_penetration_box(p, box)
+    if pen_a < 0.0:
+        face_b_inx, pen_b = find_box_axis_penetration(box, p)
         if pen_b < 0.0:
-            # polys are colliding, get collision values
-            flip: bool = not greater_than(pen_a, pen_b)  # always a to b
-
-            ref_poly: Polygon  # reference
-            inc_poly: Polygon  # incident
-            ref_poly, inc_poly = (p2, p1) if flip else (p1, p2)
-            ref_inx: int = face_b_inx if flip else face_a_inx
-
-            # get face vertices (in world space)
-            inc_v1, inc_v2 = find_incident_face_vertices(ref_poly, inc_poly, ref_inx)
-            ref_v1, ref_v2 = find_face_vertices(ref_poly, ref_inx)
-
-            side_plane_norm: Vec2 = (ref_v2 - ref_v1).normalise_self()
-            ref_face_norm: Vec2 = Vec2(side_plane_norm.y, -side_plane_norm.x)  # orthogonal
-
-            # c distance from origin
-            ref_c: float = ref_face_norm.dot(ref_v1)
-            neg_side: float = -side_plane_norm.dot(ref_v1)
-            pos_side: float = side_plane_norm.dot(ref_v2)
-
-            # Clip incident face to reference face side planes
-            inc_v1, inc_v2, sp = clip_faces(side_plane_norm.negate(), neg_side, inc_v1, inc_v2)
-            if sp < 2:
-                return False
-            inc_v1, inc_v2, sp = clip_faces(side_plane_norm, pos_side, inc_v1, inc_v2)
-            if sp < 2:
-                return False
-
-            # flip
-            m.normal = ref_face_norm.clone()
-            if flip:
-                m.normal.negate_self()
-
-            # Keep points behind reference face
-            cp: int = 0  # clipped points behind reference face
-            separation: float = ref_face_norm.dot(inc_v1) - ref_c
-            if separation <= 0:
-                m.contact_points[cp] = inc_v1.clone()
-                m.penetration = -separation
-                cp += 1
-
-            separation: float = ref_face_norm.dot(inc_v2) - ref_c
-            if separation <= 0:
-                m.contact_points[cp] = inc_v2.clone()
-                m.penetration += -separation
-                cp += 1
-
-                m.penetration /= cp  # average
-            m.contact_count = cp
-            return True
+            return clip_least_penetration(m, p, box, face_a_inx, pen_a, face_b_inx, pen_b)
     return False
 
 
+def box_colliding_poly(m: Manifold, box: Polygon, p: Polygon) -> bool:
+    face_a_inx, pen_a = find_box_axis_penetration(box, p)
+    if pen_a < 0.0:
+        face_b_inx, pen_b = find_axis_penetration_box(p, box)
+        if pen_b < 0.0:
+            return clip_least_penetration(m, box, p, face_a_inx, pen_a, face_b_inx, pen_b)
+    return False
+
+
+def clip_least_penetration(m: Manifold, p1: Polygon, p2: Polygon, face_a_inx: int, pen_a: float, face_b_inx: int, pen_b: float) -> bool:
+    """ Polys are colliding, use the face of least penetration as reference face & get collision values """
+    flip: bool = not greater_than(pen_a, pen_b)  # always a to b
+
+    ref_poly: Polygon  # reference
+    inc_poly: Polygon  # incident
+    ref_poly, inc_poly = (p2, p1) if flip else (p1, p2)
+    ref_inx: int = face_b_inx if flip else face_a_inx
+    inc_inx: int = find_incident_face(ref_poly, inc_poly, ref_inx)
+
+    return clip_incident_face(m, ref_poly, inc_poly, ref_inx, inc_inx, flip)
+
+
+def clip_incident_face(m: Manifold, ref_poly: Polygon, inc_poly: Polygon, ref_inx: int, inc_inx: int, flip: bool) -> bool:
+    """ Clip the incident face to the reference face's side planes, fill manifold with the points left behind the reference face """
+    # get face vertices (in world space)
+    inc_v1, inc_v2 = find_face_vertices(inc_poly, inc_inx)
+    ref_v1, ref_v2 = find_face_vertices(ref_poly, ref_inx)
+
+    side_plane_norm: Vec2 = (ref_v2 - ref_v1).normalise_self()
+    ref_face_norm: Vec2 = Vec2(side_plane_norm.y, -side_plane_norm.x)  # orthogonal
+
+    # c distance from origin
+    ref_c: float = ref_face_norm.dot(ref_v1)
+    neg_side: float = -side_plane_norm.dot(ref_v1)
+    pos_side: float = side_plane_norm.dot(ref_v2)
+
+    # Clip incident face to reference face side planes
+    inc_v1, inc_v2, sp = clip_faces(side_plane_norm.negate(), neg_side, inc_v1, inc_v2)
+    if sp < 2:
+        return False
+    inc_v1, inc_v2, sp = clip_faces(side_plane_norm, pos_side, inc_v1, inc_v2)
+    if sp < 2:
+        return False
+
+    # flip
+    m.feature = (flip, ref_inx, inc_inx)
+    m.normal = ref_face_norm.clone()
+    if flip:
+        m.normal.negate_self()
+
+    # Keep points behind reference face
+    cp: int = 0  # clipped points behind reference face
+    separation: float = ref_face_norm.dot(inc_v1) - ref_c
+    if separation <= 0:
+        m.contact_points[cp] = inc_v1.clone()
+        m.penetration = -separation
+        cp += 1
+
+    separation: float = ref_face_norm.dot(inc_v2) - ref_c
+    if separation <= 0:
+        m.contact_points[cp] = inc_v2.clone()
+        m.penetration += -separation
+        cp += 1
+
+        m.penetration /= cp  # average
+    m.contact_count = cp
+    return True
+
+
+def face_penetration(a: Polygon, b: Polygon, inx: int) -> float:
+    """ Penetration distance of polygon b along face inx of polygon a (negative if penetrating, see find_axis_penetration) """
+    b_mat: Mat2 = b.get_inv_mat2()
+    b_oriented_norm: Vec2 = b_mat.mul_vec(a.get_world_normals()[inx])
+    support: Vec2 = b.get_support(b_oriented_norm.negate())
+
+    vert: Vec2 = a.get_world_vertices()[inx] - b.pos
+    b_mat.mul_vec_into(vert, vert)
+    return b_oriented_norm.dot(support - vert)
+
+
 def find_axis_penetration(a: Polygon, b: Polygon) -> tuple[int, float]:
     """ Find axis (vertex of polygon a) of the least penetration (with polygon b) and return the vertex index & penetration distance """
     best_pen: float = -sys.float_info.max  # so (mostly) anything is greater than this
     best_inx: int = 0
 
+    a_normals: list[Vec2] = a.get_world_normals()
+    a_verts: list[Vec2] = a.get_world_vertices()
+    b_mat: Mat2 = b.get_inv_mat2()
+
     for i in range(a.vertex_count):
-        normal: Vec2 = a.mat2.mul_vec(a.normals[i])
+        normal: Vec2 = a_normals[i]
 
         # transform face normal into b's model space
-        b_mat: Mat2 = b.mat2.transpose()
         b_oriented_norm: Vec2 = b_mat.mul_vec(normal)
 
         # support point
         support: Vec2 = b.get_support(b_oriented_norm.negate())
 
         # transform support vertex into b's model space
-        vert: Vec2 = (a.get_oriented_vert(i)) - b.pos
-        vert: Vec2 = b_mat.mul_vec(vert)
+        vert: Vec2 = a_verts[i] - b.pos
+        b_mat.mul_vec_into(vert, vert)
 
         # distance of penetration
         penetration: float = b_oriented_norm.dot(support - vert)
@@ -287,13 +474,55 @@ def find_axis_penetration(a: Polygon, b: Polygon) -> tuple[int, float]:
     return best_inx, best_pen
 
 
+def find_box_axis_penetration(box: Polygon, p: Polygon) -> tuple[int, float]:
+    """ find_axis_penetration for the faces of an axis aligned box (SquarePoly face order: top, right, bottom, left), using the bounds of p """
+    box_bounds: AABB = box.get_aabb()
+    p_bounds: AABB = p.get_aabb()
+    pens: tuple[float, ...] = (box_bounds.min.y - p_bounds.max.y, p_bounds.min.x - box_bounds.max.x,
+                               p_bounds.min.y - box_bounds.max.y, box_bounds.min.x - p_bounds.max.x)
+
+    best_inx: int = 0
+    for i in range(1, 4):
+        if pens[i] > pens[best_inx]:
+            best_inx = i
+    return best_inx, pens[best_inx]
+
+
+def find_axis_penetration_box(p: Polygon, box: Polygon) -> tuple[int, float]:
+    """ find_axis_penetration of polygon p against an axis aligned box, the support point is the box corner furthest against each normal """
+    best_pen: float = -sys.float_info.max
+    best_inx: int = 0
+
+    bounds: AABB = box.get_aabb()
+    normals: list[Vec2] = p.get_world_normals()
+    verts: list[Vec2] = p.get_world_vertices()
+
+    for i in range(p.vertex_count):
+        normal: Vec2 = normals[i]
+        vert: Vec2 = verts[i]
+
+        # support (corner of box)
+        support_x: float = bounds.max.x if normal.x < 0 else bounds.min.x
+        support_y: float = bounds.max.y if normal.y < 0 else bounds.min.y
+
+        penetration: float = normal.x * (support_x - vert.x) + normal.y * (support_y - vert.y)
+        if penetration > best_pen:
+            best_pen = penetration
+            best_inx = i
+
+    return best_inx, best_pen
+
+
 def find_incident_face_vertices(ref_poly: Polygon, inc_poly: Polygon, ref_inx: int) -> tuple[Vec2, Vec2]:
     """ Returns face vertices on incident poly in world space """
-    ref_norm: Vec2 = ref_poly.normals[ref_inx]
+    return find_face_vertices(inc_poly, find_incident_face(ref_poly, inc_poly, ref_inx))
 
+
+def find_incident_face(ref_poly: Polygon, inc_poly: Polygon, ref_inx: int) -> int:
+    """ Returns index of the face on incident poly most facing against the reference face """
     # Calculate normal in incident's frame of reference
-    ref_norm: Vec2 = ref_poly.mat2.mul_vec(ref_norm)  # world space
-    ref_norm: Vec2 = inc_poly.mat2.transpose().mul_vec(ref_norm)  # inc model space
+    ref_norm: Vec2 = ref_poly.get_world_normals()[ref_inx]  # world space
+    ref_norm: Vec2 = inc_poly.mat2.transpose_mul_vec(ref_norm)  # inc model space
 
     # Find most anti-normal face on incident polygon
     inc_face: int = 0
@@ -304,7 +533,7 @@ def find_incident_face_vertices(ref_poly: Polygon, inc_poly: Polygon, ref_inx: i
         if dot < min_dot:
             min_dot = dot
             inc_face = i
-    return find_face_vertices(inc_poly, inc_face)
+    return inc_face
 
 
 def find_face_vertices(poly: Polygon, inx: int) -> tuple[Vec2, Vec2]:
@@ -339,3 +568,100 @@ def clip_faces(norm: Vec2, side: float, inc_face1: Vec2, inc_face2: Vec2) -> tup
         clip_no += 1
 
     return faces[0], faces[1], clip_no
+
+
+def get_shape_index(obj: Object) -> int:
+    """ Index of the object's shape in the jump table: polygon, circle or axis aligned box (static SquarePoly) """
+    if isinstance(obj, Circle):
+        return 1
+    return 2 if obj.is_axis_aligned_box() else 0
+
+
+# narrow phase function of each pair type, indexed by [shape of a][shape of b] (see get_shape_index & set_narrow_phase)
+# boxes use their fast paths against every shape, box to box uses the normal polygon path. set_narrow_phase of Polygon replaces the box paths too
+jump_table = [
+    [poly_colliding_poly, poly_colliding_circle, poly_colliding_box],
+    [circle_colliding_poly, circle_colliding_circle, circle_colliding_box],
+    [box_colliding_poly, box_colliding_circle, poly_colliding_poly]
+]
+DEFAULT_JUMP_TABLE = [row.copy() for row in jump_table]
+
+
+def get_shape_slots(shape: type) -> list[int]:
+    """ Jump table indices a type covers, polygons include the axis aligned boxes (only SquarePoly covers just the boxes) """
+    if issubclass(shape, Circle):
+        return [1]
+    return [2] if issubclass(shape, SquarePoly) else [0, 2]
+
+
+def set_narrow_phase(a_type: type, b_type: type, func=None):
+    """ Use func (m, a, b) -> bool as the narrow phase of the pair type (e.g. gjk.poly_colliding_poly), None restores the default """
+    for a in get_shape_slots(a_type):
+        for b in get_shape_slots(b_type):
+            jump_table[a][b] = func if func is not None else DEFAULT_JUMP_TABLE[a][b]
+
+
+class AxisCache:
+    """
+    Remembers the separating axis (face) of polygon pairs that did not collide, the axis is checked first the next step.
+    Nearby polygons usually stay separated by the same axis, so most pairs only need to check 1 face instead of all of them
+    """
+    def __init__(self):
+        self.axes: dict[tuple[Polygon, Polygon], tuple[bool, int]] = {}  # last step's: (face is on 2nd poly, face index)
+        self.next_axes: dict[tuple[Polygon, Polygon], tuple[bool, int]] = {}  # this step's
+
+    def add(self, p1: Polygon, p2: Polygon, on_p2: bool, inx: int):
+        """ Remember the face that separates the pair for next step """
+        self.next_axes[(p1, p2)] = on_p2, inx
+
+    def still_separating(self, p1: Polygon, p2: Polygon) -> bool:
+        """ Check if last step's separating axis still separates the pair (kept for next step if so) """
+        found = self.axes.get((p1, p2))
+        if found is None:
+            return False
+
+        on_p2, inx = found
+        if inx >= (p2 if on_p2 else p1).vertex_count:
+            return False
+        pen = face_penetration(p2, p1, inx) if on_p2 else face_penetration(p1, p2, inx)
+        if pen < 0.0:
+            return False
+
+        self.next_axes[(p1, p2)] = found
+        return True
+
+    def end_step(self):
+        """ Make this step's axes the ones checked next step (pairs which collided or stopped being candidates are dropped) """
+        self.axes, self.next_axes = self.next_axes, self.axes
+        self.next_axes.clear()
+
+    def clear(self):
+        self.axes.clear()
+        self.next_axes.clear()
+
+    def __repr__(self):
+        return f'AxisCache(axes: {len(self.axes)})'
+
+
+class ContactCache:
+    """ Keeps the impulses of every contact for the next step, so matching contacts can be warm started """
+    def __init__(self, factor=0.8):
+        self.factor: float = factor  # fraction of last step's impulse to re-apply
+        self.impulses: dict[tuple, tuple[list[float], list[float]]] = {}
+
+    def warm_start(self, collisions: list[Manifold]):
+        """ Apply last step's impulses to the manifolds that existed last step """
+        for man in collisions:
+            found = self.impulses.get(man.get_key())
+            if found is not None:
+                man.warm_start(*found, self.factor)
+
+    def store(self, collisions: list[Manifold]):
+        """ Replace the cache with the impulses of this step's manifolds (contacts that ended are dropped) """
+        self.impulses = {man.get_key(): (man.normal_impulses, man.tangent_impulses) for man in collisions}
+
+    def clear(self):
+        self.impulses.clear()
+
+    def __repr__(self):
+        return f'ContactCache(contacts: {len(self.impulses)}, factor: {self.factor})'
@@ -5,6 +5,9 @@ from constants import *
 
 
 class Mat2:
+    """ 2x2 rotation matrix. Elements are stored directly, trig is only ran when the angle is set """
+    __slots__ = ('m00', 'm01', 'm10', 'm11', 'radians')
+
     def __init__(self, radians=0.0):
         # m00, m01
         # m10, m11
@@ -29,17 +32,27 @@ class Mat2:
 
     def set_rad(self, rad: float):
         """ Set radians & update matrix (in place) """
-        self.radians = rad
-        self.refresh_matrix()
+        if rad != self.radians:
+            self.radians = rad
+            self.refresh_matrix()
 
     def add_rad(self, rad: float):
         """ Add radians to self & update matrix (in place) """
         self.radians += rad
         self.refresh_matrix()
 
+    def set_mat(self, mat: Self) -> Self:
+        """ Copy elements of given matrix into self (in place) """
+        self.m00 = mat.m00
+        self.m01 = mat.m01
+        self.m10 = mat.m10
+        self.m11 = mat.m11
+        self.radians = mat.radians
+        return self
+
     def clone(self) -> Self:
         """ Returns a copy of self """
-        return Mat2(self.radians)
+        return new_mat().set_mat(self)
 
     def abs_self(self):
         """ Absolute self (in place) """
@@ -64,6 +77,27 @@ class Mat2:
             y=(self.m10 * vec.x) + (self.m11 * vec.y)
         )
 
+    def mul_vec_into(self, vec: Vec2, out: Vec2) -> Vec2:
+        """ Rotate vec by this matrix, writing the result into out (can be vec itself). Returns out """
+        x = (self.m00 * vec.x) + (self.m01 * vec.y)
+        out.y = (self.m10 * vec.x) + (self.m11 * vec.y)
+        out.x = x
+        return out
+
+    def transpose_mul_vec(self, vec: Vec2) -> Vec2:
+        """ Returns a new vector rotated by the transpose (inverse) of this matrix, without creating the transpose """
+        return Vec2(
+            x=(self.m00 * vec.x) + (self.m10 * vec.y),
+            y=(self.m01 * vec.x) + (self.m11 * vec.y)
+        )
+
+    def transpose_mul_vec_into(self, vec: Vec2, out: Vec2) -> Vec2:
+        """ Rotate vec by the transpose (inverse) of this matrix, writing the result into out (can be vec itself). Returns out """
+        x = (self.m00 * vec.x) + (self.m10 * vec.y)
+        out.y = (self.m01 * vec.x) + (self.m11 * vec.y)
+        out.x = x
+        return out
+
     def mul_mat_self(self, mat: Self) -> Self:
         """ Multiply self by given matrix, return new matrix """
         return mul_mat(self, mat)
@@ -73,24 +107,42 @@ class Mat2:
         m01 = self.m01
         self.m01 = self.m10
         self.m10 = m01
+        self.radians = -self.radians
         return self
 
     def transpose(self) -> Self:
         """ Return a new matrix that is a transpose of this """
-        mat = self.clone()
-        mat.m01 = self.m10
-        mat.m10 = self.m01
-        return mat
+        return self.transpose_into(new_mat())
+
+    def transpose_into(self, out: Self) -> Self:
+        """ Write the transpose of this matrix into out (can be self). Returns out """
+        m01 = self.m01
+        out.m00 = self.m00
+        out.m01 = self.m10
+        out.m10 = m01
+        out.m11 = self.m11
+        out.radians = -self.radians
+        return out
+
+    def __repr__(self):
+        return f'Mat2([{self.m00}, {self.m01}], [{self.m10}, {self.m11}])'
+
+
+def new_mat() -> Mat2:
+    """ Returns an uninitialised matrix (skips the trig in __init__), every element must be set by the caller """
+    return Mat2.__new__(Mat2)
 
 
-def mul_mat(mat_a: Mat2, mat_b: Mat2) -> Mat2:
-    """ Multiply matrix a by matrix b, and return new matrix """
+def mul_mat(mat_a: Mat2, mat_b: Mat2, out: Mat2 = None) -> Mat2:
+    """ Multiply matrix a by matrix b, and return new matrix (or write into out, which can be a or b) """
     if isinstance(mat_a, Mat2) and isinstance(mat_b, Mat2):
-        mat = Mat2()
-        mat.m00 = (mat_a.m00 * mat_b.m00) + (mat_a.m01 * mat_b.m10)
-        mat.m01 = (mat_a.m00 * mat_b.m01) + (mat_a.m01 * mat_b.m11)
-        mat.m10 = (mat_a.m10 * mat_b.m00) + (mat_a.m11 * mat_b.m10)
-        mat.m11 = (mat_a.m10 * mat_b.m01) + (mat_a.m11 * mat_b.m11)
+        mat = out if out is not None else new_mat()
+        m00 = (mat_a.m00 * mat_b.m00) + (mat_a.m01 * mat_b.m10)
+        m01 = (mat_a.m00 * mat_b.m01) + (mat_a.m01 * mat_b.m11)
+        m10 = (mat_a.m10 * mat_b.m00) + (mat_a.m11 * mat_b.m10)
+        m11 = (mat_a.m10 * mat_b.m01) + (mat_a.m11 * mat_b.m11)
+        mat.m00, mat.m01, mat.m10, mat.m11 = m00, m01, m10, m11
+        mat.radians = mat_a.radians + mat_b.radians
         return mat
     else:
         raise TypeError("Given param\\s are not of type 'Mat2'")
@@ -3,10 +3,13 @@ import sys
 
 from constants import *
 from Vec2 import Vec2
+from aabb import AABB
 
 DEF_STATIC = False
 DEF_MAT = Materials.TESTING
 DEF_LAYER = 10
+DEF_CATEGORY = 0x0001  # collision category bit/s
+DEF_MASK = 0xFFFF  # collides with every category
 
 
 class Material:
@@ -18,13 +21,26 @@ class Material:
         return f'Material(rest: {self.restitution}, dens: {self.density})'
 
 
+def should_filters_ignore(a: tuple[bool, int, int, int], b: tuple[bool, int, int, int]) -> bool:
+    """ Checks whether both are static OR on different layers and neither are static OR either's category is not in the other's mask (see Object.get_filter) """
+    static_a, layer_a, category_a, mask_a = a
+    static_b, layer_b, category_b, mask_b = b
+    both_static = static_a and static_b
+    one_static = static_a or static_b
+    not_on_layer = layer_a != layer_b
+    masked = not (category_a & mask_b) or not (category_b & mask_a)
+    return both_static or (not_on_layer and not one_static) or masked
+
+
 class Object:
-    def __init__(self, pos: Vec2, static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER):
+    def __init__(self, pos: Vec2, static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER, category=DEF_CATEGORY, mask=DEF_MASK):
         self._object_type = 'Object'
         self._og_pos = pos.clone()
-        self.pos: Vec2 = pos
+        self.pos: Vec2 = pos.clone()  # own copy, pos is modified in place
         self.static: bool = static
         self.layer: int = layer
+        self.category: int = category  # bit/s of the categories this object is in
+        self.mask: int = mask  # bits of the categories this object collides with
 
         # water
         self.is_touching_water: bool = False
@@ -48,6 +64,10 @@ class Object:
         self.torque: float = 0
         self.mat2: Mat2 = Mat2(self.orientation)
 
+        # last step's pose, for rendering between steps (see World.keep_previous)
+        self.prev_pos: Vec2 = self.pos.clone()
+        self.prev_orientation: float = self.orientation
+
         # mass
         self.material: Material = Material(material)
         self.mass: float = 0
@@ -55,27 +75,69 @@ class Object:
         self.inertia: float = 0
         self.inv_inertia: float = 0
 
-    def apply_force(self, force: Vec2):
-        """ Apply external force to object """
-        self.force += force
+        # sleeping
+        self.awake: bool = True
+        self.rest_time: float = 0.0  # how long velocity has been below resting
+        self.island: list[Object] | None = None  # objects it fell asleep with, woken together
+
+        # bounds (cached, only re-calculated once moved)
+        self.bounds_dirty: bool = True
+        self._aabb: AABB = AABB()
 
-    def apply_impulse(self, impulse: Vec2, contact_vec: Vec2):
-        """ Apply given impulse to self (multiplied by inv_mass) """
+    def apply_force(self, force: Vec2):
+        """ Apply external force to object (wakes object) """
+        self.force.add_self(force)
+        self.wake()
+
+    def store_previous(self):
+        """ Remember the current pose as the previous step's """
+        self.prev_pos.set_vec(self.pos)
+        self.prev_orientation = self.orientation
+
+    def get_render_pose(self, alpha: float) -> tuple[Vec2, float]:
+        """ Pos & orientation between the previous step (alpha 0) and the current step (alpha 1) """
+        pos: Vec2 = self.prev_pos + (self.pos - self.prev_pos) * alpha
+        return pos, self.prev_orientation + (self.orientation - self.prev_orientation) * alpha
+
+    def is_active(self) -> bool:
+        """ Whether object is simulated (not static & not sleeping) """
+        return self.awake and not self.static
+
+    def wake(self):
+        """ Start simulating object again, along with the rest of the island it fell asleep with """
+        for obj in self.island if self.island is not None else [self]:
+            obj.awake = True
+            obj.rest_time = 0.0
+            obj.island = None
+
+    def sleep(self, island: list['Object'] = None):
+        """ Stop simulating object until woken """
+        self.awake = False
+        self.island = island
+        self.velocity.set(0, 0)
+        self.angular_velocity = 0
+
+    def update_rest_time(self, dt, resting_speed=Values.RESTING, resting_angular=Values.RESTING_ANGULAR):
+        """ Count time spent resting, reset once moving. Resting thresholds are squared speeds """
+        resting = self.velocity.length_sq() <= resting_speed and self.angular_velocity ** 2 <= resting_angular
+        self.rest_time = self.rest_time + dt if resting else 0.0
+
+    def apply_impulse(self, impulse: Vec2, contact_vec: Vec2, sign=1.0):
+        """ Apply given impulse to self (multiplied by inv_mass). Sign of -1 applies the negated impulse, without creating it """
         if not self.static:
-            self.velocity += impulse * self.inv_mass
-            self.angular_velocity += self.inv_inertia * contact_vec.cross_vec(impulse)
+            self.velocity.add_scaled_self(impulse, sign * self.inv_mass)
+            self.angular_velocity += self.inv_inertia * (sign * (contact_vec.x * impulse.y - contact_vec.y * impulse.x))
 
-    def update_velocity(self, dt):
+    def update_velocity(self, dt, gravity: Vec2 = Forces.GRAVITY):
         """ Should be called twice - before updating pos and after - for each physics calculation """
-        if not self.static:
+        if self.is_active():
             dt_h = dt * 0.5
-            self.velocity += self.force * dt_h  # external force
+            self.velocity.add_scaled_self(self.force, dt_h)  # external force
 
-            gravity_force: Vec2 = Forces.GRAVITY
-            self.velocity += gravity_force * dt_h
+            self.velocity.add_scaled_self(gravity, dt_h)
 
             # apply drag
-            self.velocity += self.calculate_drag()
+            self.velocity.add_self(self.calculate_drag())
 
             self.angular_velocity += self.torque * self.inv_inertia * dt_h
 
@@ -97,20 +159,47 @@ class Object:
     def get_radius(self) -> float:
         return 0.0
 
-    def update(self, dt):
+    def get_bounding_radius(self) -> float:
+        """ Radius from pos that contains the whole object, at any orientation """
+        return 0.0
+
+    def get_aabb(self) -> AABB:
+        """ World space bounds of object. Cached until the object is moved (do not modify the returned box) """
+        if self.bounds_dirty:
+            self._aabb = self.compute_aabb()
+            self.bounds_dirty = False
+        return self._aabb
+
+    def compute_aabb(self) -> AABB:
+        return AABB(self.pos.clone(), self.pos.clone())
+
+    def set_moved(self):
+        """ Mark cached bounds as out of date, should be called whenever pos or orientation is changed """
+        self.bounds_dirty = True
+
+    def update(self, dt, gravity: Vec2 = Forces.GRAVITY):
         """ See README on better dt """
-        if not self.static:
-            self.pos += self.velocity * dt
+        if self.is_active():
+            self.pos.add_scaled_self(self.velocity, dt)
             self.orientation += self.angular_velocity * dt
             self.set_orient()
+            self.set_moved()
 
-            self.update_velocity(dt)
-        else:
+            self.update_velocity(dt, gravity)
+        elif self.static:
             self.static_correction()
 
     def is_point_in_obj(self, p: Vec2):
         return False
 
+    def is_circle_overlapping(self, centre: Vec2, radius: float) -> bool:
+        """ Whether the given circle overlaps the object (touching counts) """
+        return (self.pos - centre).length_sq() <= radius * radius
+
+    def raycast(self, origin: Vec2, direction: Vec2, max_dist: float) -> tuple[float, Vec2] | None:
+        """ Distance along the ray (normalised direction) to where it enters the object & the surface normal there. None if missed, further than max dist or starting within """
+        return None
+
     def is_out_of_bounds(self, check_top=False) -> bool:
         """ Is object too far from screen bounds to be considered worth keeping alive """
         above = self.pos.y < 0 - Values.SCREEN_HEIGHT
@@ -124,15 +213,17 @@ class Object:
         if self.static:
             self.velocity.set(0, 0)
             self.angular_velocity = 0
-            self.mat2.set_rad(0)
+            if self.mat2.radians != 0:
+                self.mat2.set_rad(0)
+                self.set_moved()
+
+    def get_filter(self) -> tuple[bool, int, int, int]:
+        """ Everything deciding which objects this collides with, objects with equal filters share broadphase buckets """
+        return self.static, self.layer, self.category, self.mask
 
     def should_ignore_collision(self, b) -> bool:
-        """ Checks whether both are static OR on different layers and neither are static """
-        same_object = self == b
-        both_static = self.static and b.static
-        one_static = self.static or b.static
-        not_on_layer = self.layer != b.layer
-        return same_object or both_static or (not_on_layer and not one_static)
+        """ Checks whether same object OR the filters ignore each other (see should_filters_ignore) """
+        return self == b or should_filters_ignore(self.get_filter(), b.get_filter())
 
     def get_type(self):
         """ All objects should return of type 'Object' """
@@ -143,8 +234,8 @@ class Object:
 
 
 class Circle(Object):
-    def __init__(self, pos: Vec2, radius=5, static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER):
-        super().__init__(pos, static, material, layer)
+    def __init__(self, pos: Vec2, radius=5, static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER, category=DEF_CATEGORY, mask=DEF_MASK):
+        super().__init__(pos, static, material, layer, category, mask)
         self._object_type = 'Circle'
         self.radius: float = radius
 
@@ -162,31 +253,65 @@ class Circle(Object):
         dist = (p - self.pos).length()
         return dist < self.radius
 
+    def is_circle_overlapping(self, centre: Vec2, radius: float) -> bool:
+        total = self.radius + radius
+        return (self.pos - centre).length_sq() <= total * total
+
+    def raycast(self, origin: Vec2, direction: Vec2, max_dist: float) -> tuple[float, Vec2] | None:
+        s: Vec2 = origin - self.pos
+        b: float = s.dot(direction)
+        c: float = s.length_sq() - self.radius * self.radius
+        if c < 0:
+            return None  # starts within
+
+        disc: float = b * b - c
+        if disc < 0:
+            return None
+
+        dist: float = -b - math.sqrt(disc)
+        if dist < 0 or dist > max_dist:
+            return None
+        return dist, (s + direction * dist) / self.radius
+
     def get_radius(self) -> float:
         return self.radius
 
-    def render(self, screen: pg.Surface):
+    def get_bounding_radius(self) -> float:
+        return self.radius
+
+    def compute_aabb(self) -> AABB:
+        return AABB(self.pos - self.radius, self.pos + self.radius)
+
+    def render(self, screen: 'pg.Surface', alpha=1.0):
+        pos, orientation = self.get_render_pose(alpha)
         r = self.radius - 1
-        rot: Vec2 = Vec2(math.cos(self.orientation) * r, math.sin(self.orientation) * r)
+        rot: Vec2 = Vec2(math.cos(orientation) * r, math.sin(orientation) * r)
 
-        line_to: Vec2 = self.pos + rot
+        line_to: Vec2 = pos + rot
         pg.draw.line(screen, self.colour,
-                     self.pos.get(), line_to.get(), 1)
-        pg.draw.circle(screen, self.colour, self.pos.get(), self.radius, 1)
+                     pos.get(), line_to.get(), 1)
+        pg.draw.circle(screen, self.colour, pos.get(), self.radius, 1)
 
 
 class Polygon(Object):
     MIN_VERTEX_COUNT = 3
     MAX_VERTEX_COUNT = 16
 
-    def __init__(self, pos: Vec2, vertices=None, static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER):
-        super().__init__(pos, static, material, layer)
+    def __init__(self, pos: Vec2, vertices=None, static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER, category=DEF_CATEGORY, mask=DEF_MASK):
+        super().__init__(pos, static, material, layer, category, mask)
         self._object_type = 'Poly'
         self.vertex_count: int
         self.vertices: list[Vec2]
         self.normals: list[Vec2] = []
 
         self.mid_radius: float
+        self.outer_radius: float
+
+        # world space transform (cached, only re-calculated once moved)
+        self.transform_dirty: bool = True
+        self._world_vertices: list[Vec2] = []
+        self._world_normals: list[Vec2] = []
+        self._inv_mat2: Mat2 = Mat2()
 
         if vertices is not None:
             self.set(vertices)
@@ -240,6 +365,7 @@ class Polygon(Object):
                 outer_radius = dist
 
         self.mid_radius = (inner_radius + outer_radius) / 2
+        self.outer_radius = outer_radius
 
     def set(self, verts: list[Vec2]):
         """ Set vertices for polygon & (re) calculate the mass """
@@ -256,6 +382,11 @@ class Polygon(Object):
 
         self.compute_mass()
         self.find_radii()
+        self.store_previous()  # compute mass moves pos to the centre of mass
+
+    def is_axis_aligned_box(self) -> bool:
+        """ Whether the collision fast paths for axis aligned boxes can be used (see SquarePoly) """
+        return False
 
     def get_support(self, direction: Vec2) -> Vec2:
         """ Find objects furthest support point (vertex) along given direction """
@@ -270,25 +401,116 @@ class Polygon(Object):
                 best_vertex = v
         return best_vertex
 
-    def is_point_in_obj(self, p1: Vec2):
-        """
-        Checks whether a point is within the polygon.
-        Ray casts in direction from p1 to edge of screen, if number of faces passed though is odd, point is within poly
-        """
-        intersections = 0
-        p2: Vec2 = Vec2(0, p1.y)
+    def get_support_index(self, direction: Vec2) -> int:
+        """ Index of the support point (vertex) along given direction, see get_support """
+        best_projection: float = -sys.float_info.max
+        best_inx: int = 0
 
-        for i in range(self.vertex_count):
-            v1: Vec2 = self.get_oriented_vert(i)
-            v2: Vec2 = self.get_oriented_vert((i + 1) % self.vertex_count)
+        for i, v in enumerate(self.vertices):
+            proj: float = v.dot(direction)
 
-            if do_lines_cross((p1, p2), (v1, v2)):
-                intersections += 1
-        return bool(intersections % 2)
+            if proj > best_projection:
+                best_projection = proj
+                best_inx = i
+        return best_inx
+
+    def to_model_space(self, p: Vec2) -> Vec2:
+        """ World space point into poly's model space """
+        return self.mat2.transpose_mul_vec(p - self.pos)
+
+    def is_point_in_obj(self, p1: Vec2):
+        """ Checks whether a point is within the polygon. Point is moved into model space & must be behind every face (polygons are convex) """
+        p: Vec2 = self.to_model_space(p1)
+        for v, n in zip(self.vertices, self.normals):
+            if n.dot(p - v) > 0:
+                return False
+        return True
+
+    def is_circle_overlapping(self, centre: Vec2, radius: float) -> bool:
+        """ Circle centre within the poly, or closer than radius to a face """
+        p: Vec2 = self.to_model_space(centre)
+        radius_sq: float = radius * radius
+        inside: bool = True
+
+        for i, (v, n) in enumerate(zip(self.vertices, self.normals)):
+            separation: float = n.dot(p - v)
+            if separation > radius:
+                return False
+            if separation <= 0:
+                continue
+            inside = False
+
+            # distance to the face (as a segment)
+            face: Vec2 = self.vertices[(i + 1) % self.vertex_count] - v
+            t: float = clamp((p - v).dot(face) / face.length_sq(), 0, 1)
+            if (v + face * t).length_sq_other(p) <= radius_sq:
+                return True
+        return inside
+
+    def raycast(self, origin: Vec2, direction: Vec2, max_dist: float) -> tuple[float, Vec2] | None:
+        """ Clips the ray (in model space) against every face's half-plane, see Object.raycast """
+        o: Vec2 = self.to_model_space(origin)
+        d: Vec2 = self.mat2.transpose_mul_vec(direction)
+        lower: float = 0.0
+        upper: float = max_dist
+        inx: int = -1
+
+        for i, (v, n) in enumerate(zip(self.vertices, self.normals)):
+            numerator: float = n.dot(v - o)
+            denominator: float = n.dot(d)
+
+            if denominator == 0:
+                if numerator < 0:
+                    return None  # parallel & in front of face
+            elif denominator < 0 and numerator < lower * denominator:
+                lower = numerator / denominator  # entering face
+                inx = i
+            elif denominator > 0 and numerator < upper * denominator:
+                upper = numerator / denominator  # leaving face
+
+            if upper < lower:
+                return None
+
+        if inx < 0:
+            return None  # starts within
+        return lower, self.get_world_normals()[inx].clone()
+
+    def update_transform(self):
+        """ Re-calculate world space vertices, normals & the inverse rotation, if moved since last calculated """
+        if self.transform_dirty:
+            if len(self._world_vertices) != self.vertex_count:
+                self._world_vertices = [Vec2() for _ in range(self.vertex_count)]
+                self._world_normals = [Vec2() for _ in range(self.vertex_count)]
+
+            for v, n, world_v, world_n in zip(self.vertices, self.normals, self._world_vertices, self._world_normals):
+                self.mat2.mul_vec_into(v, world_v)
+                world_v.set(world_v.x + self.pos.x, world_v.y + self.pos.y)
+                self.mat2.mul_vec_into(n, world_n)
+            self.mat2.transpose_into(self._inv_mat2)
+            self.transform_dirty = False
+
+    def get_world_vertices(self) -> list[Vec2]:
+        """ All vertices rotated to poly's mat2 in world space (do not modify) """
+        self.update_transform()
+        return self._world_vertices
+
+    def get_world_normals(self) -> list[Vec2]:
+        """ All face normals rotated to poly's mat2 (do not modify) """
+        self.update_transform()
+        return self._world_normals
+
+    def get_inv_mat2(self) -> Mat2:
+        """ Inverse (transpose) of poly's mat2, rotates world space into model space (do not modify) """
+        self.update_transform()
+        return self._inv_mat2
 
     def get_oriented_vert(self, index: int) -> Vec2:
-        """ Returns vertice at given index rotated to poly's mat2 in world space """
-        return self.mat2.mul_vec(self.vertices[index]) + self.pos
+        """ Returns vertice at given index rotated to poly's mat2 in world space (do not modify) """
+        return self.get_world_vertices()[index]
+
+    def set_moved(self):
+        super().set_moved()
+        self.transform_dirty = True
 
     def set_orient(self):
         self.mat2.set_rad(self.orientation)
@@ -296,24 +518,48 @@ class Polygon(Object):
     def get_radius(self) -> float:
         return self.mid_radius
 
-    def render(self, screen: pg.Surface):
-        pg.draw.rect(screen, self.colour, pg.Rect(self.pos.get(), (1, 1)))  # com
-        last_vertex: Vec2 = self.get_oriented_vert(-1)
+    def get_bounding_radius(self) -> float:
+        return self.outer_radius
 
-        for i in range(self.vertex_count):
-            vert: Vec2 = self.get_oriented_vert(i)
+    def compute_aabb(self) -> AABB:
+        box = AABB(Vec2(sys.float_info.max, sys.float_info.max), Vec2(-sys.float_info.max, -sys.float_info.max))
+        for v in self.get_world_vertices():
+            box.min.set(min(box.min.x, v.x), min(box.min.y, v.y))
+            box.max.set(max(box.max.x, v.x), max(box.max.y, v.y))
+        return box
+
+    def get_render_vertices(self, alpha: float) -> list[Vec2]:
+        """ World vertices at the pose between the previous & current step (see get_render_pose) """
+        if alpha == 1 or (self.prev_pos == self.pos and self.prev_orientation == self.orientation):
+            return self.get_world_vertices()  # at current pose, cached
+
+        pos, orientation = self.get_render_pose(alpha)
+        mat: Mat2 = Mat2(orientation)
+        return [mat.mul_vec(v) + pos for v in self.vertices]
+
+    def render(self, screen: 'pg.Surface', alpha=1.0):
+        pos, _ = self.get_render_pose(alpha)
+        pg.draw.rect(screen, self.colour, pg.Rect(pos.get(), (1, 1)))  # com
+        verts: list[Vec2] = self.get_render_vertices(alpha)
+        last_vertex: Vec2 = verts[-1]
+
+        for vert in verts:
             pg.draw.line(screen, self.colour, last_vertex.get(), vert.get(), 1)
             last_vertex = vert
 
 
 class SquarePoly(Polygon):
-    def __init__(self, pos: Vec2, size=Vec2(1, 1), static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER):
+    def __init__(self, pos: Vec2, size=Vec2(1, 1), static=DEF_STATIC, material=DEF_MAT, layer=DEF_LAYER, category=DEF_CATEGORY, mask=DEF_MASK):
         self._object_type = 'SquarePoly'
         self.pos = pos
         self.size = size
 
         vertices = self.generate_vertices()
-        super().__init__(pos, vertices, static, material, layer)
+        super().__init__(pos, vertices, static, material, layer, category, mask)
+
+    def is_axis_aligned_box(self) -> bool:
+        """ Static squares are kept un-rotated by static_correction, so are axis aligned boxes """
+        return self.static and self.mat2.radians == 0
 
     def generate_vertices(self) -> list[Vec2]:
         """ Applies normals to size before adding to pos """
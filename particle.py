@@ -1,20 +1,21 @@
-import time
-
 from constants import *
 from Vec2 import Vec2
+from clock import Clock
 
 
 class Particle:
-    def __init__(self, pos: Vec2,
+    def __init__(self, pos: Vec2, clock: Clock,
                  colour=Colours.WHITE, layer=10, size=Vec2(1, 1), velocity=Vec2(0, 0),
                  lifetime=1):
         self.pos = pos
+        self.prev_pos = pos.clone()  # last step's pos, for rendering between steps
         self.size = size
         self.layer = layer
 
         self.colour = colour
         self.lifetime = lifetime
-        self.alive = time.time()
+        self.clock = clock  # simulation clock of the world the particle is in
+        self.alive = clock.time
 
         self.velocity = velocity
 
@@ -22,22 +23,26 @@ class Particle:
     def rect(self):
         return pg.Rect(self.pos.get(), self.size.get())
 
+    def store_previous(self):
+        self.prev_pos = self.pos.clone()
+
     def should_del(self):
         is_off_screen = self.pos.x > Values.SCREEN_WIDTH or self.pos.x < 0 or self.pos.y > Values.SCREEN_HEIGHT
-        is_dead = time.time() - self.alive > self.lifetime
+        is_dead = self.clock.time - self.alive > self.lifetime
         return is_off_screen or is_dead
 
-    def update_velocity(self, dt):
+    def update_velocity(self, dt, gravity: Vec2 = Forces.GRAVITY):
         dt_h = dt * 0.5
-        self.velocity += (Forces.GRAVITY * 2) * dt_h
+        self.velocity += (gravity * 2) * dt_h
 
-    def update(self, dt):
-        self.update_velocity(dt)
+    def update(self, dt, gravity: Vec2 = Forces.GRAVITY):
+        self.update_velocity(dt, gravity)
         self.pos += self.velocity * dt
-        self.update_velocity(dt)  # see README
+        self.update_velocity(dt, gravity)  # see README
 
-    def render(self, screen: pg.Surface):
-        pg.draw.rect(screen, self.colour, self.rect)
+    def render(self, screen: 'pg.Surface', alpha=1.0):
+        pos: Vec2 = self.prev_pos + (self.pos - self.prev_pos) * alpha
+        pg.draw.rect(screen, self.colour, pg.Rect(pos.get(), self.size.get()))
 
     def __repr__(self):
         return f'Particle(layer: {self.layer})'
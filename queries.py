@@ -0,0 +1,108 @@
+from constants import *
+from Vec2 import Vec2, EPSILON_SQ
+from aabb import AABB
+from objects import Object, DEF_MASK
+from broadphase import DynamicTree
+
+# World queries (point, box, circle & ray) served from AABB trees, so each query only tests the objects near it instead of every object
+
+
+class RayHit:
+    """ First object hit by a ray """
+    def __init__(self, obj: Object, point: Vec2, normal: Vec2, distance: float):
+        self.obj: Object = obj
+        self.point: Vec2 = point
+        self.normal: Vec2 = normal  # surface normal of obj at point
+        self.distance: float = distance
+
+    def __repr__(self):
+        return f'RayHit(obj: {self.obj}, point: {self.point}, distance: {self.distance})'
+
+
+class WorldQuery:
+    """
+    Keeps a DynamicTree (fat boxes, only re-inserted once objects leave them) of the objects, refresh once per step after objects have moved.
+    The trees are only synced on the first query after a refresh (or after the objects' group changes), so steps without queries cost nothing.
+    Query results are in the same order as the objects given to refresh. Queries can be filtered by category bits & static-ness
+    """
+    def __init__(self):
+        self.tree: DynamicTree = DynamicTree()
+        self.order: dict[Object, int] = {}
+        self.objects: list[Object] = []
+        self.dirty: bool = False
+        self.group = None  # world.Group owning the objects, if given
+        self.group_version: int = 0  # group's version when last synced
+
+    def refresh(self, objects: list[Object], group=None):
+        """ Mark the objects as moved, the trees are brought up to date before the next query. Adding to / removing from group between refreshes is picked up too """
+        self.objects = objects
+        self.group = group
+        self.dirty = True
+
+    def is_stale(self) -> bool:
+        return self.dirty or (self.group is not None and self.group.version != self.group_version)
+
+    def sync(self):
+        if self.is_stale():
+            self.tree.sync(self.objects, [obj.get_aabb() for obj in self.objects])
+            self.order = {obj: i for i, obj in enumerate(self.objects)}
+            self.group_version = self.group.version if self.group is not None else 0
+            self.dirty = False
+
+    def is_wanted(self, obj: Object, mask: int, include_static: bool) -> bool:
+        return bool(obj.category & mask) and (include_static or not obj.static)
+
+    def get_candidates(self, box: AABB, mask: int, include_static: bool) -> list[Object]:
+        """ Objects whose current bounds overlap box, in order """
+        self.sync()
+        found = self.tree.dynamic_tree.query(box)
+        if include_static:
+            found += self.tree.static_tree.query(box)
+
+        found = [obj for obj in found if self.is_wanted(obj, mask, include_static) and obj.get_aabb().overlaps(box)]
+        found.sort(key=self.order.get)
+        return found
+
+    def query_aabb(self, box: AABB, mask=DEF_MASK, include_static=True) -> list[Object]:
+        """ Objects whose bounds overlap box """
+        return self.get_candidates(box, mask, include_static)
+
+    def query_point(self, p: Vec2, mask=DEF_MASK, include_static=True) -> list[Object]:
+        """ Objects the point is within """
+        box = AABB(p.clone(), p.clone())
+        return [obj for obj in self.get_candidates(box, mask, include_static) if obj.is_point_in_obj(p)]
+
+    def query_circle(self, centre: Vec2, radius: float, mask=DEF_MASK, include_static=True) -> list[Object]:
+        """ Objects overlapping the circle """
+        box = AABB(centre - radius, centre + radius)
+        return [obj for obj in self.get_candidates(box, mask, include_static) if obj.is_circle_overlapping(centre, radius)]
+
+    def raycast(self, origin: Vec2, direction: Vec2, max_dist: float, mask=DEF_MASK, include_static=True) -> RayHit | None:
+        """ First object hit by the ray within max dist (objects the ray starts within are ignored) """
+        if direction.length_sq() <= EPSILON_SQ:
+            return None
+        direction = direction.clone().normalise_self()
+        self.sync()
+        best: list[RayHit] = []
+
+        def hit_func(obj: Object, max_d: float) -> float:
+            if not self.is_wanted(obj, mask, include_static):
+                return max_d
+
+            hit = obj.raycast(origin, direction, max_d)
+            if hit is None:
+                return max_d
+
+            dist, normal = hit
+            if best and dist == best[0].distance and self.order.get(obj) > self.order.get(best[0].obj):
+                return max_d  # same distance, keep the first object
+            best[:] = [RayHit(obj, origin + direction * dist, normal, dist)]
+            return dist
+
+        self.tree.dynamic_tree.raycast(origin, direction, max_dist, hit_func)
+        if include_static:
+            self.tree.static_tree.raycast(origin, direction, best[0].distance if best else max_dist, hit_func)
+        return best[0] if best else None
+
+    def __repr__(self):
+        return f'WorldQuery(objects: {len(self.objects)})'
@@ -1,9 +1,9 @@
 import math
-import time
 
 from constants import *
 from Vec2 import Vec2
 from objects import Object
+from clock import Clock
 
 
 # done: ripples spawned on object collision of water surface. Object velocity & mass affects ripple behaviour (strength, speed)
@@ -23,7 +23,8 @@ MAX_STRENGTH = 5.0
 
 class Ripple:
     """ Generates the block order that a ripple will travel (in both directions) """
-    def __init__(self, strength: float, start_inx: int, max_inx: int, speed: float, direction: int):
+    def __init__(self, clock: Clock, strength: float, start_inx: int, max_inx: int, speed: float, direction: int):
+        self.clock: Clock = clock
         self.direction: int = direction  # < -1, < 0 >, 1 >
         self.strength: float = strength
         self.strength_decay: float = 0.98
@@ -37,7 +38,7 @@ class Ripple:
 
         self.strength_cut_off: float = 1
 
-        self.last_progressed: float = time.time()
+        self.last_progressed: float = clock.time
         self.accumulated_dt: float = 0
 
     def generate_order(self) -> list:
@@ -70,15 +71,16 @@ class Ripple:
 
 class BlockSine:
     """ One ripple handled for one block """
-    def __init__(self, strength):
+    def __init__(self, clock: Clock, strength):
+        self.clock: Clock = clock
         self.strength: float = strength
 
-        self.started_time: float = time.time()
+        self.started_time: float = clock.time
         self.max_time_alive: float = 0.8
 
     def get_sine(self):
         """ Return sine value for block """
-        time_alive = time.time() - self.started_time
+        time_alive = self.clock.time - self.started_time
         time_left = self.max_time_alive - time_alive
 
         perc_completed = time_left / self.max_time_alive
@@ -106,7 +108,7 @@ class WaterBlock:
     def new_sine(self, strength, offset):
         """ Create a fresh ripple for the block, places at start of list """
         if strength > 0 and len(self.block_sines) < self.max_sines:
-            s = BlockSine(strength)
+            s = BlockSine(self.water.clock, strength)
             s.started_time -= offset
             self.block_sines.insert(0, s)
 
@@ -125,15 +127,16 @@ class WaterBlock:
             new_r.y -= val
         self.rect = new_r
 
-    def render(self, screen: pg.Surface):
+    def render(self, screen: 'pg.Surface'):
         if self.prev_rect != self.rect:
             pg.draw.rect(screen, Colours.BLUE, self.prev_rect)  # behind block
         pg.draw.rect(screen, Colours.LIGHT_BLUE, self.rect)
 
 
 class Water:
-    def __init__(self, pos: Vec2, size: Vec2, block_size=4):
+    def __init__(self, pos: Vec2, size: Vec2, clock: Clock, block_size=4):
         margin = Vec2(0, 20)
+        self.clock: Clock = clock  # simulation clock of the world the water is in
         self.pos: Vec2 = pos
         self.size: Vec2 = size
 
@@ -215,7 +218,7 @@ class Water:
     def queue_ripple(self, block_inx: int, strength=MAX_STRENGTH, speed=BASE_RIPPLE_SPEED, direction=0):
         """ Add new ripple to the ripple queue. Inserts at beginning of queue """
         sp_mul = BASE_SPEED_MUL + (BASE_SPEED_MUL - self.blocks_size)
-        self.queued_ripples.insert(0, Ripple(strength, block_inx, len(self.blocks), speed * max(1.0, sp_mul), direction))
+        self.queued_ripples.insert(0, Ripple(self.clock, strength, block_inx, len(self.blocks), speed * max(1.0, sp_mul), direction))
 
     def update_ripple(self, ripple, ripple_inx, offset) -> bool:
         """ Progress ripple, giving sines and spawning rebound ripples if needed. Returns whether ripple was kept """
@@ -240,7 +243,7 @@ class Water:
         Iterations are how many times the r should be progressed. Based on how much time since the r was last updated, and the r's speed.
         """
         for i, ripple in enumerate(self.ripples):
-            ripple.accumulated_dt += time.time() - ripple.last_progressed
+            ripple.accumulated_dt += self.clock.time - ripple.last_progressed
             iterations = math.floor(ripple.accumulated_dt / ripple.ripple_speed)
 
             for it in range(iterations):
@@ -248,7 +251,7 @@ class Water:
                 if not self.update_ripple(ripple, i, offset):
                     break  # stop iterating if deleted
 
-            ripple.last_progressed = time.time()
+            ripple.last_progressed = self.clock.time
             ripple.accumulated_dt -= ripple.ripple_speed * iterations
 
     def add_queued_ripples(self):
@@ -309,6 +312,9 @@ class Water:
                     is_touching, is_submerged, is_fully_submerged, depth = self.resolve_collision(obj)
                     obj.water_depth = depth
 
+                if (is_touching, is_submerged, is_fully_submerged) != (obj.is_touching_water, obj.is_submerged, obj.is_fully_submerged):
+                    obj.wake()  # entered or left the water
+
                 obj.is_touching_water = is_touching
                 obj.is_submerged = is_submerged
                 obj.is_fully_submerged = is_fully_submerged
@@ -320,7 +326,7 @@ class Water:
         self.update_all_ripples()
         self.add_queued_ripples()
 
-    def render(self, screen: pg.Surface):
+    def render(self, screen: 'pg.Surface'):
         pg.draw.rect(screen, Colours.DARKER_GREY, pg.Rect(self.bounds_pos.get(), self.bounds_size.get()), 2)
         pg.draw.rect(screen, Colours.DARK_GREY, pg.Rect(self.pos.get(), self.size.get()), 2)
         for b in self.blocks:
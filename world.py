@@ -0,0 +1,230 @@
+from constants import *
+
+from manifold import Manifold, ContactCache, AxisCache
+from broadphase import Broadphase, SpatialHash
+import islands
+import batch_collision
+import batch_solver
+from queries import WorldQuery
+from water import Water
+from objects import Object
+from Vec2 import Vec2
+from clock import Clock
+
+
+class Group:
+    """ Group to store instances of different layers in order of lowest to highest. Optimised for retrieval of objects. """
+    def __init__(self, add_objects=None, group_type=None):
+        self.layer_nums = {}  # amount of stored objects with layer x
+        self.objects = []  # ordered by layers, low - high
+        self.group_type = group_type  # type strong group
+        self.version: int = 0  # changed on every add & removal, so views of the objects (WorldQuery) know to rebuild
+
+        if add_objects is not None:
+            self.add_mul(add_objects)
+
+    def set_type(self, obj):
+        """ set group type if not set """
+        if self.group_type is None:
+            self.group_type = get_type_of(obj)
+
+    def add(self, obj):
+        """ Add new layer to dict (if needed), insert object at end of objects' layer in list """
+        self.set_type(obj)
+
+        if get_type_of(obj) == self.group_type:
+            l = obj.layer
+            if l not in self.layer_nums:
+                self.layer_nums[l] = 0
+
+            index = sum(amnt for layer, amnt in self.layer_nums.items() if layer <= l)  # points to end of layer section in list
+
+            self.objects.insert(index, obj)
+            self.layer_nums[obj.layer] += 1
+            self.version += 1
+            obj.store_previous()  # no movement to interpolate yet, includes any pose set after construction
+        else:
+            print(f'WARN: Could not add object "{obj}" to group of a different group type: "{self.group_type}"')
+
+    def add_mul(self, lis: list):
+        for obj in lis:
+            self.add(obj)
+
+    def remove_at_index(self, inx, obj=None):
+        """ Fast method of removal. Returns successful deletion """
+        if inx < len(self.objects):
+            obj = obj if obj is not None else self.objects[inx]
+            self.layer_nums[obj.layer] -= 1
+
+            if self.layer_nums[obj.layer] <= 0:
+                self.layer_nums.pop(obj.layer)
+
+            del self.objects[inx]
+            self.version += 1
+            return True
+        return False
+
+    def remove_obj(self, o):
+        """ Slow method of removal. Returns success on location, and deletion of object """
+        try:
+            found = [[i, obj] for i, obj in enumerate(self.objects) if obj == o][0]
+            return self.remove_at_index(*found)
+        except IndexError:
+            return False
+
+    def clear(self):
+        """ Clears the entire group & resets the type. """
+        self.layer_nums.clear()
+        self.objects.clear()
+        self.group_type = None
+        self.version += 1
+
+    def render_all(self, screen: 'pg.Surface', alpha=1.0):
+        """ alpha: how far between the previous & current step to draw (see World.keep_previous) """
+        for obj in self.objects:
+            obj.render(screen, alpha)
+
+    def __repr__(self):
+        return f'Group(type: ({self.group_type}), objects: {len(self.objects)}, layer/s: {len(self.layer_nums.keys())})'
+
+
+class World:
+    """
+    Owns the bodies, particles & water and steps the physics, without any rendering or input (no display needed).
+    Game is a client on top of this, headless simulations can use it directly & step as fast as they like
+    """
+    def __init__(self, broadphase: Broadphase = None, batch_narrow_phase=False, batch_solve=False,
+                 gravity: Vec2 = None, dt=Values.DT):
+        self.gravity: Vec2 = gravity if gravity is not None else Forces.GRAVITY.clone()
+        self.dt: float = dt
+        self.steps: int = 0  # steps taken since created
+        self.clock: Clock = Clock()  # simulation time, give to anything timed in the world (water, particles)
+        self.keep_previous: bool = False  # store every body's pose before each step, so renders can interpolate between steps
+
+        self.resolve_iterations = 16  # max per island, higher = more stable but less performant
+        self.min_resolve_iterations = 4  # islands get 2 iterations per collision between min & max, solving stops early once converged
+        self.iterations_used: list[int] = []  # per island, last step
+
+        # objects
+        self.objects_group = Group()
+        self.particles_group = Group()
+        self.water: Water | None = None
+        self.collisions: list[Manifold] = []
+        self.contact_cache: ContactCache | None = ContactCache()  # warm starts the solver with last step's impulses (None to disable)
+        self.axis_cache: AxisCache | None = AxisCache()  # polygon pairs test last step's separating axis first (None to disable)
+        self.allow_sleeping: bool = True  # resting islands stop being simulated until woken
+        self.islands: list[list[Object]] = []
+        self.island_collisions: list[list[Manifold]] = []
+        self.broadphase: Broadphase = broadphase if broadphase is not None else SpatialHash()  # see broadphase.py for others
+        self.batch_narrow_phase: bool = batch_narrow_phase  # solve pairs of the same shape types together (needs numpy)
+        self.batch_solve: bool = batch_solve  # resolve collisions in graph coloured batches (needs numpy)
+        self.world_query: WorldQuery = WorldQuery()  # point, box, circle & ray queries, refreshed once per step
+
+    def set_objects(self, objects: list[Object]):
+        """ Replace every object in the world """
+        self.objects_group.clear()
+        self.objects_group.add_mul(objects)
+        self.world_query.refresh(self.objects_group.objects, self.objects_group)
+
+    def init_collisions(self, objs: list):
+        """ Check the broadphase candidate pairs of the objects given. If colliding, fill manifold values & add it to collision list """
+        pairs = [(a, b) for a, b in self.broadphase.find_pairs(objs) if a.is_active() or b.is_active()]  # skip sleeping pairs
+        if self.batch_narrow_phase:
+            self.collisions += batch_collision.solve_pairs(pairs)
+            return
+
+        for a, b in pairs:
+            man = Manifold(a, b, self.axis_cache)
+            man.solve_collision()
+
+            if man.contact_count > 0:
+                self.collisions.append(man)
+
+        if self.axis_cache is not None:
+            self.axis_cache.end_step()
+
+    def get_resting(self) -> tuple[float, float]:
+        """ Squared (speed, angular speed) below which bodies count as resting, a step of this world's gravity """
+        resting: float = (self.gravity * self.dt).length_sq() + EPSILON
+        return resting, Values.RESTING_ANGULAR * resting / Values.RESTING
+
+    def get_iteration_budget(self, island_collisions: list[Manifold]) -> int:
+        """ Max solver iterations for an island, bigger islands (stacks) need more passes to converge """
+        return clamp(2 * len(island_collisions), self.min_resolve_iterations, self.resolve_iterations)
+
+    def update_objects(self):
+        objects = self.objects_group.objects
+
+        self.collisions.clear()
+        self.init_collisions(objects)
+        while islands.wake_touched(self.collisions):  # contacts within the woken islands were skipped while sleeping
+            self.collisions.clear()
+            self.init_collisions(objects)
+
+        # apply rest of velocity from last frame
+        for obj in objects:
+            obj.update_velocity(self.dt, self.gravity)
+
+        # resolve collisions, apply impulses
+        if self.contact_cache is not None:
+            self.contact_cache.warm_start(self.collisions)
+
+        self.islands, self.island_collisions = islands.build_islands(objects, self.collisions)
+        budgets = [self.get_iteration_budget(colls) for colls in self.island_collisions]
+        resting, resting_angular = self.get_resting()
+        if self.batch_solve:
+            self.iterations_used = batch_solver.solve_islands(self.island_collisions, budgets, Forces.RESOLVE_TOLERANCE, resting)
+        else:
+            self.iterations_used = [islands.solve_island(colls, budget, Forces.RESOLVE_TOLERANCE, resting)
+                                    for colls, budget in zip(self.island_collisions, budgets)]
+
+        if self.contact_cache is not None:
+            self.contact_cache.store(self.collisions)
+
+        # apply velocity
+        for obj in objects:
+            obj.update(self.dt, self.gravity)
+
+        # correct positions
+        for coll in self.collisions:
+            coll.positional_correction()
+
+        if self.allow_sleeping:
+            islands.update_sleeping(self.islands, self.dt, resting, resting_angular)
+
+        # conclusion
+        for i, obj in enumerate(objects):
+            obj.force.set(0, 0)
+            obj.torque = 0
+
+            if obj.is_out_of_bounds():
+                self.objects_group.remove_at_index(i, obj)
+
+        self.world_query.refresh(objects, self.objects_group)
+
+    def update_particles(self):
+        for i, part in enumerate(self.particles_group.objects):
+            if part.should_del():
+                self.particles_group.remove_at_index(i, part)
+            part.update(self.dt, self.gravity)
+
+    def step(self, n=1):
+        """ Advance the simulation by n steps of dt """
+        for _ in range(n):
+            if self.keep_previous:
+                for obj in self.objects_group.objects:
+                    obj.store_previous()
+                for part in self.particles_group.objects:
+                    part.store_previous()
+
+            if self.water is not None:
+                self.water.check_collision(self.objects_group.objects)
+                self.water.update()
+
+            self.update_particles()
+            self.update_objects()
+            self.steps += 1
+            self.clock.tick(self.dt)
+
+    def __repr__(self):
+        return f'World(objects: {len(self.objects_group.objects)}, steps: {self.steps}, dt: {self.dt})'